@@ -0,0 +1,129 @@
+"""
+Attendance writes shared by the scan endpoints, the scan queue and batch updates.
+
+At most one active (non-undone) record exists per student per WIB day, enforced
+by the unique index uq_attendance_student_date. Writes use a single
+INSERT ... ON CONFLICT statement, so concurrent scanners cannot create
+duplicates and no check-then-insert query is needed.
+
+Every write also adjusts the attendance_daily_summary counters in the same
+transaction (see summaries.py).
+"""
+from datetime import date, datetime
+from typing import Dict, Iterable, Tuple
+from sqlalchemy.orm import Session
+from .database import dialect_insert
+from .models import Attendance
+from .summaries import count_attendance
+from .timezone_utils import wib_date
+
+ScanKey = Tuple[int, date]  # (student_id, attendance_date)
+
+_ACTIVE = Attendance.is_undone == False
+_CONFLICT_TARGET = dict(
+    index_elements=[Attendance.student_id, Attendance.attendance_date],
+    index_where=_ACTIVE,
+)
+
+
+def existing_attendance_map(db: Session, keys: Iterable[ScanKey]) -> Dict[ScanKey, int]:
+    """
+    Look up active attendance for every (student_id, day) key with one query.
+    Returns {(student_id, day): attendance_id}.
+    """
+    keys = set(keys)
+    if not keys:
+        return {}
+    rows = db.query(Attendance.id, Attendance.student_id, Attendance.attendance_date).filter(
+        Attendance.student_id.in_({student_id for student_id, _ in keys}),
+        Attendance.attendance_date.in_({day for _, day in keys}),
+        _ACTIVE
+    ).all()
+    return {
+        (row.student_id, row.attendance_date): row.id
+        for row in rows
+        if (row.student_id, row.attendance_date) in keys
+    }
+
+
+def insert_attendance(db: Session, scans: Iterable[Tuple[int, datetime, str]]) -> Dict[ScanKey, Tuple[int, bool]]:
+    """
+    Record (student_id, scanned_at, status) scans, one per student per WIB day.
+    Days that already have an active record are left untouched.
+    Returns {(student_id, day): (attendance_id, inserted)}. Does not commit.
+    """
+    now = datetime.utcnow()
+    rows = {}
+    for student_id, scanned_at, status in scans:
+        key = (student_id, wib_date(scanned_at))
+        if key not in rows:
+            rows[key] = {
+                "student_id": student_id,
+                "scanned_at": scanned_at,
+                "attendance_date": key[1],
+                "status": status,
+                "is_undone": False,
+                "created_at": now,
+            }
+    if not rows:
+        return {}
+
+    stmt = (
+        dialect_insert(Attendance.__table__)
+        .values(list(rows.values()))
+        .on_conflict_do_nothing(**_CONFLICT_TARGET)
+        .returning(Attendance.id, Attendance.student_id, Attendance.attendance_date)
+    )
+    result = {
+        (row.student_id, row.attendance_date): (row.id, True)
+        for row in db.execute(stmt)
+    }
+
+    count_attendance(db, [attendance_id for attendance_id, _ in result.values()])
+
+    conflicts = [key for key in rows if key not in result]
+    for key, attendance_id in existing_attendance_map(db, conflicts).items():
+        result[key] = (attendance_id, False)
+    return result
+
+
+def upsert_attendance(
+    db: Session, records: Iterable[Tuple[int, date, datetime, str]]
+) -> Dict[ScanKey, Tuple[int, bool]]:
+    """
+    Set the status and scan time of (student_id, day, scanned_at, status)
+    records, creating the day's record when it does not exist.
+    Returns {(student_id, day): (attendance_id, created)}. Does not commit.
+    """
+    now = datetime.utcnow()
+    rows = {
+        (student_id, day): {
+            "student_id": student_id,
+            "scanned_at": scanned_at,
+            "attendance_date": day,
+            "status": status,
+            "is_undone": False,
+            "created_at": now,
+        }
+        for student_id, day, scanned_at, status in records
+    }
+    if not rows:
+        return {}
+
+    existing = existing_attendance_map(db, rows)
+    # Existing records may change status: take them out of the counters
+    # before the update and count everything written afterwards.
+    count_attendance(db, existing.values(), sign=-1)
+
+    stmt = dialect_insert(Attendance.__table__).values(list(rows.values()))
+    stmt = stmt.on_conflict_do_update(
+        **_CONFLICT_TARGET,
+        set_={"status": stmt.excluded.status, "scanned_at": stmt.excluded.scanned_at},
+    ).returning(Attendance.id, Attendance.student_id, Attendance.attendance_date)
+
+    written = {
+        (row.student_id, row.attendance_date): (row.id, (row.student_id, row.attendance_date) not in existing)
+        for row in db.execute(stmt)
+    }
+    count_attendance(db, [attendance_id for attendance_id, _ in written.values()])
+    return written
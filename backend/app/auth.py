@@ -1,8 +1,10 @@
 """
 Authentication and JWT token management + RBAC helpers.
 """
+import threading
+import time
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, NamedTuple, Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
@@ -10,7 +12,7 @@ from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from .config import get_settings
 from .database import get_db
-from .models import User
+from .models import User, TeacherClassAccess
 
 settings = get_settings()
 
@@ -19,6 +21,68 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
 
+class CachedUser(NamedTuple):
+    id: int
+    username: str
+    role: str
+    is_active: bool
+    created_at: datetime
+    classes: Optional[frozenset]  # None for admin (all classes)
+
+
+class AuthCache:
+    """
+    username -> CachedUser, so authenticated requests need no auth queries.
+
+    Entries expire after AUTH_CACHE_TTL_SECONDS and are dropped by
+    invalidate_user() whenever routes/users.py changes a user. A version
+    counter keeps a load that raced with an invalidation from being stored.
+    The cache is per process; the TTL bounds staleness across workers.
+    """
+
+    def __init__(self, ttl_seconds: int):
+        self.ttl = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: Dict[str, tuple] = {}  # username -> (expires_at, CachedUser)
+        self._version = 0
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def get(self, username: str) -> Optional[CachedUser]:
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[username]
+                return None
+            return entry[1]
+
+    def put(self, user: CachedUser, version: int) -> None:
+        """Store `user` unless the cache was invalidated since `version` was read."""
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            if version == self._version:
+                self._entries[user.username] = (time.monotonic() + self.ttl, user)
+
+    def invalidate_user(self, user_id: int) -> None:
+        with self._lock:
+            self._version += 1
+            for username in [name for name, (_, user) in self._entries.items() if user.id == user_id]:
+                del self._entries[username]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+
+
+auth_cache = AuthCache(settings.AUTH_CACHE_TTL_SECONDS)
+
+
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
@@ -55,7 +119,14 @@ def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
 ) -> User:
+    return get_user_from_token(token, db)
+
 
+def get_user_from_token(token: str, db: Session) -> User:
+    """
+    Resolve an access token to an active user.
+    Shared by the HTTP dependency and WebSocket endpoints.
+    """
     payload = verify_token(token)
     username: str = payload.get("sub")
     
@@ -66,21 +137,48 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user = db.query(User).filter(User.username == username).first()
-    if user is None:
+    cached = auth_cache.get(username) or _load_cached_user(username, db)
+    if cached is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    if not user.is_active:
+    if not cached.is_active:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Inactive user"
         )
     
-    return user
+    # Detached copy: only the columns above are loaded
+    return User(
+        id=cached.id,
+        username=cached.username,
+        role=cached.role,
+        is_active=cached.is_active,
+        created_at=cached.created_at
+    )
+
+
+def _load_cached_user(username: str, db: Session) -> Optional[CachedUser]:
+    """Load a user and their class access from the database and cache them."""
+    version = auth_cache.version
+    user = db.query(User).filter(User.username == username).first()
+    if user is None:
+        return None
+    
+    classes = None
+    if user.role != "admin":
+        classes = frozenset(
+            row.class_name for row in db.query(TeacherClassAccess.class_name).filter(
+                TeacherClassAccess.user_id == user.id
+            )
+        )
+    
+    cached = CachedUser(user.id, user.username, user.role, user.is_active, user.created_at, classes)
+    auth_cache.put(cached, version)
+    return cached
 
 
 def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
@@ -123,20 +221,19 @@ def require_teacher(current_user: User = Depends(get_current_user)) -> User:
     return current_user
 
 
-def get_teacher_classes(user: User, db: Session):
+def get_teacher_classes(user: User, db: Session) -> Optional[frozenset]:
     """
-    Get list of class names that teacher has access to.
+    Get the class names that teacher has access to.
     Returns None for admin (has access to all classes).
-    Returns list of class names for teacher.
+    Returns a frozenset of class names for teacher, from the auth cache when possible.
     """
-    from .models import TeacherClassAccess
-    
     if user.role == "admin":
         return None  # Admin has access to all classes
     
-    # Get teacher's assigned classes
-    accesses = db.query(TeacherClassAccess).filter(
-        TeacherClassAccess.user_id == user.id
-    ).all()
+    cached = auth_cache.get(user.username)
+    if cached is None or cached.id != user.id:
+        cached = _load_cached_user(user.username, db)
+    if cached is None or cached.id != user.id:
+        return frozenset()
     
-    return [access.class_name for access in accesses]
+    return cached.classes if cached.classes is not None else frozenset()
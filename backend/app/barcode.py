@@ -1,10 +1,14 @@
 
+import os
 import json
 import hmac
 import hashlib
 import base64
 import time
 import uuid
+import tempfile
+import threading
+from collections import OrderedDict
 from typing import Tuple, Dict, Optional
 from io import BytesIO
 import qrcode
@@ -13,6 +17,55 @@ from .config import get_settings
 
 settings = get_settings()
 
+# HMAC key schedule computed once; each signature works on a copy
+_HMAC_KEY = hmac.new(settings.SECRET_KEY.encode('utf-8'), digestmod=hashlib.sha256)
+
+
+def _sign(payload_bytes: bytes) -> bytes:
+    mac = _HMAC_KEY.copy()
+    mac.update(payload_bytes)
+    return mac.digest()
+
+
+class VerifiedTokenCache:
+    """Bounded LRU of verified token payloads, keyed by the token string."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[Dict]:
+        with self._lock:
+            payload = self._entries.get(token)
+            if payload is not None:
+                self._entries.move_to_end(token)
+            return payload
+
+    def put(self, token: str, payload: Dict) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[token] = payload
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate_student(self, student_id: str) -> None:
+        """Drop every cached token issued to a student."""
+        student_id = str(student_id)
+        with self._lock:
+            stale = [t for t, p in self._entries.items() if p["sid"] == student_id]
+            for token in stale:
+                del self._entries[token]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = VerifiedTokenCache(settings.TOKEN_CACHE_SIZE)
+
 
 def base64url_encode(data: bytes) -> str:
     return base64.urlsafe_b64encode(data).decode('utf-8').rstrip('=')
@@ -36,11 +89,7 @@ def generate_token(student_id: str) -> Tuple[str, str]:
     payload_json = json.dumps(payload, separators=(',', ':'), sort_keys=True)
     payload_bytes = payload_json.encode('utf-8')
     
-    signature = hmac.new(
-        settings.SECRET_KEY.encode('utf-8'),
-        payload_bytes,
-        hashlib.sha256
-    ).digest()
+    signature = _sign(payload_bytes)
     
     payload_b64 = base64url_encode(payload_bytes)
     sig_b64 = base64url_encode(signature)
@@ -51,6 +100,24 @@ def generate_token(student_id: str) -> Tuple[str, str]:
 
 
 def verify_token(token: str) -> Dict:
+    """
+    Verify a QR token and return its payload.
+    Verified payloads are served from an LRU cache; call
+    invalidate_student_tokens() when a student's barcode_nonce changes.
+    """
+    payload = token_cache.get(token)
+    if payload is None:
+        payload = _verify_token_uncached(token)
+        token_cache.put(token, payload)
+    return dict(payload)
+
+
+def invalidate_student_tokens(student_id: str) -> None:
+    """Forget cached verifications for a student (token regenerated or revoked)."""
+    token_cache.invalidate_student(student_id)
+
+
+def _verify_token_uncached(token: str) -> Dict:
 
     try:
         parts = token.split('.')
@@ -64,11 +131,7 @@ def verify_token(token: str) -> Dict:
         
         provided_signature = base64url_decode(sig_b64)
         
-        expected_signature = hmac.new(
-            settings.SECRET_KEY.encode('utf-8'),
-            payload_bytes,
-            hashlib.sha256
-        ).digest()
+        expected_signature = _sign(payload_bytes)
         
         if not hmac.compare_digest(provided_signature, expected_signature):
             raise ValueError("Invalid token signature")
@@ -108,9 +171,24 @@ def generate_qr_image(token: str, size: int = 300) -> BytesIO:
     return buffer
 
 
+def qr_png_bytes(token: str, size: int = 300) -> bytes:
+    """PNG bytes of a token's QR code (picklable, for process pool workers)."""
+    return generate_qr_image(token, size).getvalue()
+
+
+def write_file_atomic(filepath: str, data: bytes) -> None:
+    """Write through a temporary file in the same directory, so readers never see a partial file."""
+    directory = os.path.dirname(filepath) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
 def save_qr_image(token: str, filepath: str, size: int = 300) -> None:
  
-    buffer = generate_qr_image(token, size)
-    
-    with open(filepath, 'wb') as f:
-        f.write(buffer.getvalue())
+    write_file_atomic(filepath, qr_png_bytes(token, size))
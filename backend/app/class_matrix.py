@@ -0,0 +1,91 @@
+"""
+Monthly attendance grid of one class: a row per student, a column per day
+the class has attendance, a status code per cell.
+
+Cells live in a flat array('B') (one byte each, row-major) instead of
+nested dicts, and totals are computed from it in one pass. The API sends
+each row as a string of code digits.
+"""
+from array import array
+from datetime import date
+from typing import Iterable, List, NamedTuple
+
+STATUSES = ['Present', 'Late', 'Sick', 'Permission', 'Absent']
+# Cell code: 0 = no record, n = STATUSES[n - 1]
+NO_RECORD = 0
+_CODES = {status: code for code, status in enumerate(STATUSES, start=1)}
+
+
+class MatrixStudent(NamedTuple):
+    id: int
+    nis: str
+    name: str
+
+
+class ClassMatrix:
+    """Status grid of a class for one month."""
+
+    def __init__(self, class_name: str, month: date, students: List[MatrixStudent], days: List[date]):
+        self.class_name = class_name
+        self.month = month
+        self.students = students
+        self.days = days
+        self.cells = array('B', bytes(len(students) * len(days)))
+
+    @classmethod
+    def from_rows(cls, class_name: str, month: date, rows: Iterable) -> "ClassMatrix":
+        """
+        Build the grid from (id, nis, name, attendance_date, status) rows,
+        ordered by student; students without attendance have date None.
+        """
+        students: List[MatrixStudent] = []
+        records = []
+        for student_id, nis, name, attendance_date, status in rows:
+            if not students or students[-1].id != student_id:
+                students.append(MatrixStudent(student_id, nis, name))
+            if attendance_date is not None:
+                records.append((len(students) - 1, attendance_date, _CODES.get(status, NO_RECORD)))
+
+        days = sorted({attendance_date for _, attendance_date, _ in records})
+        matrix = cls(class_name, month, students, days)
+        column = {day: index for index, day in enumerate(days)}
+        width = len(days)
+        for row, attendance_date, code in records:
+            matrix.cells[row * width + column[attendance_date]] = code
+        return matrix
+
+    def row(self, index: int) -> array:
+        """Cell codes of the student at `index`."""
+        width = len(self.days)
+        return self.cells[index * width:(index + 1) * width]
+
+    def student_totals(self) -> List[List[int]]:
+        """Per student, the number of days with each status (in STATUSES order)."""
+        totals = []
+        for index in range(len(self.students)):
+            counts = [0] * (len(STATUSES) + 1)
+            for code in self.row(index):
+                counts[code] += 1
+            totals.append(counts[1:])
+        return totals
+
+    def day_totals(self) -> List[List[int]]:
+        """Per day, the number of students with each status (in STATUSES order)."""
+        width = len(self.days)
+        counts = [[0] * (len(STATUSES) + 1) for _ in range(width)]
+        for position, code in enumerate(self.cells):
+            counts[position % width][code] += 1
+        return [day[1:] for day in counts]
+
+    def to_dict(self) -> dict:
+        """Compact form for the API: each row is a string of code digits."""
+        return {
+            "class_name": self.class_name,
+            "month": self.month.strftime("%Y-%m"),
+            "statuses": STATUSES,
+            "days": [day.day for day in self.days],
+            "students": [student._asdict() for student in self.students],
+            "rows": ["".join(map(str, self.row(index))) for index in range(len(self.students))],
+            "student_totals": self.student_totals(),
+            "day_totals": self.day_totals(),
+        }
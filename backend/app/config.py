@@ -14,6 +14,29 @@ class Settings(BaseSettings):
     
     STORAGE_PATH: str = "./storage"
     
+    # Worker threads for blocking route handlers (database work)
+    THREADPOOL_SIZE: int = 40
+    
+    # Scan ingestion: write-behind queue with group commit (morning rush)
+    SCAN_QUEUE_ENABLED: bool = False
+    SCAN_QUEUE_BATCH_SIZE: int = 50
+    SCAN_QUEUE_FLUSH_INTERVAL_MS: int = 200
+    
+    # Oldest offline scan /scan-batch accepts, in hours before now
+    SCAN_REPLAY_MAX_AGE_HOURS: int = 24
+    
+    # Number of verified QR tokens kept in memory
+    TOKEN_CACHE_SIZE: int = 4096
+    
+    # Seconds an authenticated user (role, active flag, classes) stays cached; 0 disables
+    AUTH_CACHE_TTL_SECONDS: int = 60
+    
+    # Processes rendering QR images for bulk generation; 0 = one per CPU
+    QR_RENDER_WORKERS: int = 0
+    
+    # Rendered QR images kept in memory for /download-qr
+    QR_IMAGE_CACHE_SIZE: int = 512
+    
     class Config:
         env_file = "../.env"
         case_sensitive = True
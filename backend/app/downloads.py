@@ -0,0 +1,19 @@
+"""
+Headers for file downloads.
+"""
+from urllib.parse import quote
+
+
+def content_disposition(filename: str, inline: bool = False) -> str:
+    """
+    Content-Disposition for a download (or, with inline, a file the browser
+    shows itself). Names that are not plain ASCII (class and student names
+    often are not) are RFC 5987-encoded in filename*, with an ASCII
+    filename as fallback for old clients.
+    """
+    disposition = "inline" if inline else "attachment"
+    quoted = quote(filename, safe="")
+    if quoted == filename:
+        return f'{disposition}; filename="{filename}"'
+    fallback = "".join(c if " " <= c < "\x7f" and c not in '"\\' else "_" for c in filename)
+    return f"{disposition}; filename=\"{fallback}\"; filename*=utf-8''{quoted}"
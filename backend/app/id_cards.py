@@ -0,0 +1,193 @@
+"""
+Printable student ID card sheets as PDF.
+
+Each A4 page is drawn as one raster with Pillow (card frame, photo, QR
+code, name, NIS and class) on the render process pool, pages in
+parallel. The PDF around the page images is written here by hand: every
+page is a single losslessly compressed (Flate) image, so no PDF library
+is needed. QR codes come from qr_store, rasterized once per token and
+reused, and are only scaled here.
+"""
+import io
+import os
+import zlib
+from collections import deque
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterator, List, NamedTuple, Optional
+from PIL import Image, ImageDraw, ImageFont, ImageOps
+from .config import get_settings
+from .qr_bulk import qr_render_pool
+from .qr_store import get_qr_png
+
+settings = get_settings()
+
+DPI = 200
+A4_POINTS = (595.28, 841.89)
+PAGE_SIZE = (round(210 / 25.4 * DPI), round(297 / 25.4 * DPI))
+MARGIN = round(10 / 25.4 * DPI)
+GAP = round(4 / 25.4 * DPI)
+
+
+class CardData(NamedTuple):
+    nis: str
+    name: str
+    class_name: str
+    qr_png: bytes
+    photo: Optional[bytes]
+
+
+def load_card(student) -> CardData:
+    """Card contents of a student row (nis, name, class_name, barcode_token, photo_path)."""
+    _, qr_png = get_qr_png(student.barcode_token)
+    photo = None
+    if student.photo_path:
+        try:
+            with open(os.path.join(settings.STORAGE_PATH, student.photo_path), "rb") as f:
+                photo = f.read()
+        except OSError:
+            pass
+    return CardData(student.nis, student.name, student.class_name, qr_png, photo)
+
+
+def _fit_text(draw: ImageDraw.ImageDraw, text: str, font, width: int) -> str:
+    """`text`, shortened with an ellipsis until it fits in `width` pixels."""
+    if draw.textlength(text, font=font) <= width:
+        return text
+    while text and draw.textlength(text + "…", font=font) > width:
+        text = text[:-1]
+    return text + "…"
+
+
+def _draw_card(page: Image.Image, draw: ImageDraw.ImageDraw, card: CardData, box, fonts) -> None:
+    left, top, right, bottom = box
+    width, height = right - left, bottom - top
+    name_font, detail_font = fonts
+    draw.rounded_rectangle(box, radius=GAP, outline=(90, 90, 90), width=3)
+
+    padding = max(8, height // 20)
+    text_height = height // 4
+    square = min(height - text_height - 2 * padding, (width - 3 * padding) // 2)
+
+    # Photo on the left, QR code on the right, both square
+    photo_box = (left + padding, top + padding, left + padding + square, top + padding + square)
+    qr_left = right - padding - square
+    if card.photo:
+        try:
+            photo = ImageOps.fit(Image.open(io.BytesIO(card.photo)).convert("RGB"), (square, square))
+            page.paste(photo, photo_box[:2])
+        except OSError:
+            draw.rectangle(photo_box, outline=(170, 170, 170), width=2)
+    else:
+        draw.rectangle(photo_box, outline=(170, 170, 170), width=2)
+
+    qr = Image.open(io.BytesIO(card.qr_png)).convert("RGB")
+    page.paste(qr.resize((square, square), Image.NEAREST), (qr_left, top + padding))
+
+    text_top = top + 2 * padding + square
+    text_width = width - 2 * padding
+    draw.text((left + padding, text_top), _fit_text(draw, card.name, name_font, text_width),
+              font=name_font, fill=(0, 0, 0))
+    draw.text((left + padding, text_top + text_height // 2),
+              _fit_text(draw, f"NIS {card.nis}  ·  Kelas {card.class_name}", detail_font, text_width),
+              font=detail_font, fill=(60, 60, 60))
+
+
+def render_page(cards: List[CardData], columns: int, rows: int) -> bytes:
+    """
+    Draw up to columns x rows cards on an A4 raster and return its RGB
+    pixels, Flate-compressed for the PDF. Runs in a pool worker.
+    """
+    page = Image.new("RGB", PAGE_SIZE, "white")
+    draw = ImageDraw.Draw(page)
+    cell_width = (PAGE_SIZE[0] - 2 * MARGIN - (columns - 1) * GAP) // columns
+    cell_height = (PAGE_SIZE[1] - 2 * MARGIN - (rows - 1) * GAP) // rows
+    text_height = cell_height // 4
+    fonts = (
+        ImageFont.load_default(size=max(12, text_height // 3)),
+        ImageFont.load_default(size=max(10, text_height // 4)),
+    )
+    for index, card in enumerate(cards):
+        row, column = divmod(index, columns)
+        left = MARGIN + column * (cell_width + GAP)
+        top = MARGIN + row * (cell_height + GAP)
+        _draw_card(page, draw, card, (left, top, left + cell_width, top + cell_height), fonts)
+    return zlib.compress(page.tobytes(), 6)
+
+
+class _PdfWriter:
+    """Minimal PDF writer for image-only pages, emitting bytes as objects are added."""
+
+    def __init__(self):
+        self.offset = 0
+        self.offsets = {}
+        self.page_ids: List[int] = []
+        self.next_id = 3  # 1 = catalog, 2 = page tree, written last
+
+    def _object(self, object_id: int, body: bytes) -> bytes:
+        self.offsets[object_id] = self.offset
+        data = f"{object_id} 0 obj\n".encode() + body + b"\nendobj\n"
+        self.offset += len(data)
+        return data
+
+    def header(self) -> bytes:
+        data = b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n"
+        self.offset += len(data)
+        return data
+
+    def page(self, pixels: bytes) -> bytes:
+        image_id, content_id, page_id = self.next_id, self.next_id + 1, self.next_id + 2
+        self.next_id += 3
+        self.page_ids.append(page_id)
+        width, height = A4_POINTS
+        content = f"q {width} 0 0 {height} 0 0 cm /Im0 Do Q".encode()
+        return b"".join([
+            self._object(image_id, (
+                f"<< /Type /XObject /Subtype /Image /Width {PAGE_SIZE[0]} /Height {PAGE_SIZE[1]} "
+                f"/ColorSpace /DeviceRGB /BitsPerComponent 8 /Filter /FlateDecode /Length {len(pixels)} >>\n"
+                "stream\n"
+            ).encode() + pixels + b"\nendstream"),
+            self._object(content_id, f"<< /Length {len(content)} >>\nstream\n".encode() + content + b"\nendstream"),
+            self._object(page_id, (
+                f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {width} {height}] "
+                f"/Resources << /XObject << /Im0 {image_id} 0 R >> >> /Contents {content_id} 0 R >>"
+            ).encode()),
+        ])
+
+    def trailer(self) -> bytes:
+        kids = " ".join(f"{page_id} 0 R" for page_id in self.page_ids)
+        data = self._object(2, f"<< /Type /Pages /Kids [{kids}] /Count {len(self.page_ids)} >>".encode())
+        data += self._object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        xref = [f"xref\n0 {self.next_id}\n0000000000 65535 f \n"]
+        xref += [f"{self.offsets[object_id]:010d} 00000 n \n" for object_id in range(1, self.next_id)]
+        xref.append(f"trailer\n<< /Size {self.next_id} /Root 1 0 R >>\nstartxref\n{self.offset}\n%%EOF\n")
+        return data + "".join(xref).encode()
+
+
+def iter_cards_pdf(students: List, columns: int, rows: int) -> Iterator[bytes]:
+    """
+    The PDF of all students' cards (rows as taken by load_card), yielded
+    page by page. A few pages render ahead on the pool; the card data of
+    a page is only loaded when it is submitted, to keep memory bounded.
+    """
+    per_page = columns * rows
+    sheets = [students[start:start + per_page] for start in range(0, len(students), per_page)] or [[]]
+    executor = qr_render_pool.executor()
+    ahead = 2 * qr_render_pool.workers
+    pending = deque()
+    pdf = _PdfWriter()
+    yield pdf.header()
+    try:
+        for sheet in sheets:
+            pending.append(executor.submit(render_page, [load_card(student) for student in sheet], columns, rows))
+            if len(pending) >= ahead:
+                yield pdf.page(pending.popleft().result())
+        while pending:
+            yield pdf.page(pending.popleft().result())
+    except BrokenProcessPool:
+        # A worker died; start a fresh pool on the next run
+        qr_render_pool.shutdown()
+        raise
+    finally:
+        for future in pending:
+            future.cancel()
+    yield pdf.trailer()
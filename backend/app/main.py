@@ -1,14 +1,20 @@
 
 import os
+import anyio.to_thread
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from .database import Base, engine
+from .database import Base, engine, SessionLocal
+from .migrations import run_migrations
 from .routes import auth, students, attendance, reports, users
 from .routes import class_schedules
+from .scan_queue import scan_queue
+from .qr_bulk import qr_render_pool
+from .qr_store import StorageFiles
+from .schedule_cache import schedule_cache
 
-# Create database tables
+# Create database tables and upgrade existing ones
 Base.metadata.create_all(bind=engine)
+run_migrations(engine)
 
 app = FastAPI(title="Student Attendance API", version="1.0.0")
 
@@ -19,6 +25,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Content-Disposition", "X-Next-Cursor", "X-Total-Count", "X-Generated-Count", "X-Skipped-Count"],
 )
 
 # Include routers
@@ -38,6 +45,24 @@ async def startup_event():
     barcodes_dir = os.path.join(settings.STORAGE_PATH, "barcodes")
     os.makedirs(barcodes_dir, exist_ok=True)
     print(f"✓ Storage directory created: {barcodes_dir}")
+    
+    # Route handlers are plain functions run in this threadpool
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_SIZE
+    
+    # Late thresholds are read from memory by the scan endpoints
+    with SessionLocal() as db:
+        schedule_cache.reload(db)
+    
+    if settings.SCAN_QUEUE_ENABLED:
+        scan_queue.start()
+        print(f"✓ Scan queue enabled (batch {settings.SCAN_QUEUE_BATCH_SIZE}, every {settings.SCAN_QUEUE_FLUSH_INTERVAL_MS} ms)")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Flush pending scans and stop the QR render processes before the process exits."""
+    scan_queue.stop()
+    qr_render_pool.shutdown()
 
 
 @app.get("/")
@@ -63,6 +88,6 @@ settings = get_settings()
 if os.path.exists(settings.STORAGE_PATH):
     app.mount(
         "/storage",
-        StaticFiles(directory=settings.STORAGE_PATH),
+        StorageFiles(directory=settings.STORAGE_PATH),
         name="storage"
     )
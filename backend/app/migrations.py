@@ -0,0 +1,91 @@
+"""
+Lightweight schema upgrades for existing databases.
+
+Base.metadata.create_all() only creates missing tables. Columns and indexes
+added to existing tables are brought in here. Every step is idempotent and
+runs at startup, right after create_all().
+"""
+import logging
+from datetime import datetime
+from sqlalchemy import inspect, text, update, select, func, and_
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateIndex
+from sqlalchemy.orm import Session
+from .database import Base
+from .models import Attendance, AttendanceDailySummary, StudentPeriodSummary
+from .summaries import rebuild_daily_summary, rebuild_period_summary
+
+logger = logging.getLogger(__name__)
+
+
+def run_migrations(engine: Engine) -> None:
+    """Upgrade an existing database to the current models."""
+    _add_attendance_date(engine)
+    _create_missing_indexes(engine)
+    _fill_summaries(engine)
+
+
+def _add_attendance_date(engine: Engine) -> None:
+    """
+    Add attendance.attendance_date, backfill it from scanned_at and retire
+    duplicate same-day records so the unique (student_id, attendance_date)
+    index can be built. The earliest record of each day is kept; later ones
+    are marked undone.
+    """
+    inspector = inspect(engine)
+    columns = {column["name"] for column in inspector.get_columns("attendance")}
+    indexes = {index["name"] for index in inspector.get_indexes("attendance")}
+    table = Attendance.__table__
+
+    with engine.begin() as conn:
+        if "attendance_date" not in columns:
+            conn.execute(text("ALTER TABLE attendance ADD COLUMN attendance_date DATE"))
+            logger.info("Added attendance.attendance_date")
+
+        backfilled = conn.execute(
+            update(table)
+            .where(table.c.attendance_date.is_(None), table.c.scanned_at.isnot(None))
+            .values(attendance_date=func.date(table.c.scanned_at))
+        ).rowcount
+        if backfilled:
+            logger.info("Backfilled attendance_date for %s rows", backfilled)
+
+        if "uq_attendance_student_date" in indexes:
+            return
+
+        keep = (
+            select(func.min(table.c.id))
+            .where(table.c.is_undone == False)
+            .group_by(table.c.student_id, table.c.attendance_date)
+        )
+        retired = conn.execute(
+            update(table)
+            .where(and_(table.c.is_undone == False, table.c.id.not_in(keep)))
+            .values(is_undone=True, undone_at=datetime.utcnow())
+        ).rowcount
+        if retired:
+            logger.warning("Marked %s duplicate same-day attendance rows as undone", retired)
+
+
+def _create_missing_indexes(engine: Engine) -> None:
+    """Create indexes declared on the models that an older database lacks."""
+    # IF NOT EXISTS rather than checkfirst: SQLite cannot reflect expression
+    # indexes such as ix_students_name_lower
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                conn.execute(CreateIndex(index, if_not_exists=True))
+
+
+def _fill_summaries(engine: Engine) -> None:
+    """Build the attendance rollups once for a database that predates them."""
+    with Session(engine) as db:
+        if db.query(Attendance.id).filter(Attendance.is_undone == False).first() is None:
+            return
+        for model, rebuild in [
+            (AttendanceDailySummary, rebuild_daily_summary),
+            (StudentPeriodSummary, rebuild_period_summary),
+        ]:
+            if db.query(model.count).first() is None:
+                rows = rebuild(db)
+                logger.info("Built %s (%s rows)", model.__tablename__, rows)
@@ -1,8 +1,9 @@
 
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text, Time
+from sqlalchemy import Column, Integer, String, DateTime, Date, Boolean, ForeignKey, Text, Time, Index, UniqueConstraint, event, func
 from sqlalchemy.orm import relationship
 from datetime import datetime, time
 from .database import Base
+from .timezone_utils import wib_date
 
 
 class User(Base):
@@ -42,6 +43,13 @@ class Student(Base):
     attendances = relationship("Attendance", back_populates="student", cascade="all, delete-orphan")
 
 
+# Student lists: class rosters in name order, the whole school by name, and
+# case-insensitive name prefix search
+Index("ix_students_class_name_name", Student.class_name, Student.name)
+Index("ix_students_name", Student.name)
+Index("ix_students_name_lower", func.lower(Student.name))
+
+
 class Attendance(Base):
     """Attendance record model with status tracking."""
     __tablename__ = "attendance"
@@ -49,6 +57,7 @@ class Attendance(Base):
     id = Column(Integer, primary_key=True, index=True)
     student_id = Column(Integer, ForeignKey("students.id", ondelete="CASCADE"), nullable=False)
     scanned_at = Column(DateTime, default=datetime.utcnow, index=True)
+    attendance_date = Column(Date, nullable=True, index=True)  # WIB calendar date of scanned_at
     status = Column(String(20), default='Present', nullable=False)  # Present, Late, Sick, Permission, Absent
     is_undone = Column(Boolean, default=False)
     undone_at = Column(DateTime, nullable=True)
@@ -58,6 +67,49 @@ class Attendance(Base):
     student = relationship("Student", back_populates="attendances")
 
 
+# Range scans for reports: per student, and across all students
+Index("ix_attendance_student_scanned", Attendance.student_id, Attendance.scanned_at)
+Index("ix_attendance_scanned_undone", Attendance.scanned_at, Attendance.is_undone)
+
+# At most one active (non-undone) record per student per WIB day
+Index(
+    "uq_attendance_student_date",
+    Attendance.student_id,
+    Attendance.attendance_date,
+    unique=True,
+    sqlite_where=Attendance.is_undone == False,
+    postgresql_where=Attendance.is_undone == False,
+)
+
+
+@event.listens_for(Attendance, "before_insert")
+def _derive_attendance_date(mapper, connection, target):
+    """Fill attendance_date from scanned_at for ORM inserts that do not set it."""
+    if target.attendance_date is None and target.scanned_at is not None:
+        target.attendance_date = wib_date(target.scanned_at)
+
+
+class AttendanceDailySummary(Base):
+    """Active attendance counts per day, class and status (maintained incrementally)."""
+    __tablename__ = "attendance_daily_summary"
+    
+    attendance_date = Column(Date, primary_key=True)
+    class_name = Column(String(50), primary_key=True)
+    status = Column(String(20), primary_key=True)
+    count = Column(Integer, default=0, nullable=False)
+
+
+class StudentPeriodSummary(Base):
+    """Active attendance counts per student, semester and status (maintained incrementally)."""
+    __tablename__ = "student_period_summary"
+    
+    student_id = Column(Integer, ForeignKey("students.id", ondelete="CASCADE"), primary_key=True)
+    year = Column(Integer, primary_key=True)  # calendar year of the semester
+    semester = Column(Integer, primary_key=True)  # 1 = July-December, 2 = January-June
+    status = Column(String(20), primary_key=True)
+    count = Column(Integer, default=0, nullable=False)
+
+
 class ClassSchedule(Base):
     """Class schedule with configurable late threshold per class."""
     __tablename__ = "class_schedule"
@@ -68,6 +120,24 @@ class ClassSchedule(Base):
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Relationships
+    weekday_thresholds = relationship(
+        "ClassWeekdayThreshold",
+        cascade="all, delete-orphan",
+        order_by="ClassWeekdayThreshold.weekday"
+    )
+
+
+class ClassWeekdayThreshold(Base):
+    """Late threshold override for one weekday of a class (0 = Monday)."""
+    __tablename__ = "class_weekday_threshold"
+    __table_args__ = (UniqueConstraint("class_name", "weekday", name="uq_class_weekday"),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    class_name = Column(String(50), ForeignKey("class_schedule.class_name", ondelete="CASCADE"), nullable=False)
+    weekday = Column(Integer, nullable=False)
+    late_threshold_time = Column(Time, nullable=False)
 
 
 class TeacherClassAccess(Base):
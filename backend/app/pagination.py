@@ -0,0 +1,36 @@
+"""
+Opaque cursors for keyset pagination.
+
+A cursor holds the sort key of the last row of a page. The next page
+continues strictly after it, so deep pages cost the same as the first
+one and rows inserted meanwhile do not shift the page boundaries.
+"""
+import base64
+import json
+from datetime import datetime
+from fastapi import HTTPException, status
+
+# Largest page a list endpoint returns; bulk pulls use cursors or streaming
+MAX_PAGE_SIZE = 5000
+
+
+def encode_cursor(*values) -> str:
+    """Cursor for a sort key; datetimes are stored as ISO strings."""
+    key = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(key, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    """Sort key of a cursor made by encode_cursor, with `size` values. 400 if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        key = json.loads(raw)
+    except ValueError:
+        key = None
+    if not isinstance(key, list) or len(key) != size:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    return key
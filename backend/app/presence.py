@@ -0,0 +1,83 @@
+"""
+In-memory "present today" index.
+
+Keeps the students that already have a (non-undone) attendance record for the
+current WIB day, so repeated scans are answered without a database round trip.
+The index is loaded once per WIB day and resets itself after midnight.
+
+The index is per process. With several workers a scan may miss another
+worker's entry; the unique (student_id, attendance_date) index still keeps
+the database free of duplicates.
+"""
+import threading
+from datetime import date
+from typing import Dict, Optional
+from sqlalchemy import and_
+from sqlalchemy.orm import Session
+from .models import Attendance
+from .timezone_utils import get_wib_now
+
+
+class PresenceIndex:
+    """Map of student_id -> attendance_id for today's WIB date."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._day: Optional[date] = None
+        self._present: Dict[int, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+
+    def _ensure_loaded(self, db: Session) -> None:
+        """Reload from the database when the WIB day has changed. Caller holds the lock."""
+        today = get_wib_now().date()
+        if self._day == today:
+            return
+
+        rows = db.query(Attendance.id, Attendance.student_id).filter(
+            and_(
+                Attendance.attendance_date == today,
+                Attendance.is_undone == False
+            )
+        ).all()
+
+        self._present = {row.student_id: row.id for row in rows}
+        self._day = today
+        self.loads += 1
+
+    def lookup(self, db: Session, student_id: int) -> Optional[int]:
+        """Return today's attendance id for the student, or None if not present yet."""
+        with self._lock:
+            self._ensure_loaded(db)
+            attendance_id = self._present.get(student_id)
+            if attendance_id is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return attendance_id
+
+    def mark_present(self, student_id: int, attendance_id: int, day: date) -> None:
+        """Record a new attendance. Ignored if `day` is not the loaded day."""
+        with self._lock:
+            if day == self._day:
+                self._present[student_id] = attendance_id
+
+    def mark_absent(self, student_id: int, day: date) -> None:
+        """Forget a student's attendance (after undo). Ignored if `day` is not the loaded day."""
+        with self._lock:
+            if day == self._day:
+                self._present.pop(student_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "day": self._day.isoformat() if self._day else None,
+                "present": len(self._present),
+                "hits": self.hits,
+                "misses": self.misses,
+                "loads": self.loads,
+            }
+
+
+presence_index = PresenceIndex()
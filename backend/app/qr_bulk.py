@@ -0,0 +1,202 @@
+"""
+Bulk QR code rendering for a class or the whole school.
+
+Rendering a QR PNG is CPU-bound Python (qrcode + Pillow), so bulk runs
+render on a process pool instead of one request thread. The parent
+process writes every PNG atomically into storage/barcodes and appends it
+to a ZIP that is streamed to the client while later images are still
+rendering. One bulk run at a time; its progress can be polled.
+
+Images are stored content-addressed (see qr_store).
+"""
+import logging
+import multiprocessing
+import os
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from itertools import repeat
+from typing import Iterator, List, NamedTuple, Optional
+from starlette.requests import ClientDisconnect
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+from .barcode import qr_png_bytes
+from .config import get_settings
+from .qr_store import QR_SIZE, save_qr_png
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Images per pool task: small enough that the ZIP starts and progress moves early
+RENDER_CHUNK_SIZE = 8
+
+
+class QrJob(NamedTuple):
+    student_id: int
+    nis: str
+    name: str
+    class_name: str
+    token: str
+
+
+class QrRenderPool:
+    """Process pool for QR rendering, started on first use and stopped at shutdown."""
+
+    def __init__(self, workers: int):
+        self.workers = workers or os.cpu_count() or 1
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: workers must not inherit the server's threads and connections
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+
+qr_render_pool = QrRenderPool(settings.QR_RENDER_WORKERS)
+
+
+class BulkQrProgress:
+    """State of the current (or last) bulk run."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.running = False
+        self.total = 0
+        self.rendered = 0
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.error: Optional[str] = None
+
+    def begin(self) -> bool:
+        """Claim the run before any token is touched. Returns False if one is already running."""
+        with self._lock:
+            if self.running:
+                return False
+            self.running, self.total, self.rendered = True, 0, 0
+            self.started_at, self.finished_at, self.error = datetime.utcnow(), None, None
+            return True
+
+    def set_total(self, total: int) -> None:
+        with self._lock:
+            self.total = total
+
+    def advance(self) -> None:
+        with self._lock:
+            self.rendered += 1
+
+    def fail(self, error: str) -> None:
+        """Record why the run stopped; the run stays claimed until finish()."""
+        with self._lock:
+            self.error = error
+
+    def finish(self, error: Optional[str] = None) -> None:
+        """Release the run. Safe to call more than once."""
+        with self._lock:
+            if not self.running:
+                return
+            self.running = False
+            self.finished_at = datetime.utcnow()
+            if error and not self.error:
+                self.error = error
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "running": self.running,
+                "total": self.total,
+                "rendered": self.rendered,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "error": self.error,
+            }
+
+
+bulk_progress = BulkQrProgress()
+
+
+class _ZipSink:
+    """Write-only file object collecting ZipFile output between yields."""
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def take(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def _archive_name(job: QrJob) -> str:
+    def safe(part: str) -> str:
+        return part.replace("/", "-").replace("\\", "-")
+    return f"{safe(job.class_name)}/QR_{safe(job.nis)}_{safe(job.name)}.png"
+
+
+def iter_qr_zip(jobs: List[QrJob]) -> Iterator[bytes]:
+    """
+    Render every job on the process pool (in order), save each PNG and
+    yield the ZIP archive piece by piece. Errors are recorded on
+    bulk_progress; BulkQrResponse releases the run.
+    """
+    sink = _ZipSink()
+    try:
+        # PNGs are already compressed; store them as they are
+        with zipfile.ZipFile(sink, "w", zipfile.ZIP_STORED) as archive:
+            pngs = qr_render_pool.executor().map(
+                qr_png_bytes, [job.token for job in jobs], repeat(QR_SIZE), chunksize=RENDER_CHUNK_SIZE
+            )
+            for job, png in zip(jobs, pngs):
+                save_qr_png(job.token, png)
+                archive.writestr(_archive_name(job), png)
+                bulk_progress.advance()
+                yield sink.take()
+        yield sink.take()
+    except GeneratorExit:
+        bulk_progress.fail("Client disconnected")
+        raise
+    except Exception as e:
+        bulk_progress.fail(str(e) or type(e).__name__)
+        logger.exception("Bulk QR rendering failed")
+        if isinstance(e, BrokenProcessPool):
+            # A worker died; start a fresh pool on the next run
+            qr_render_pool.shutdown()
+        raise
+
+
+class BulkQrResponse(StreamingResponse):
+    """
+    The ZIP of a bulk run. The run is released when the response ends in
+    any way, including a client that disconnects before the body starts
+    (the generator then never runs, and background tasks are skipped).
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        error = None
+        try:
+            await super().__call__(scope, receive, send)
+        except BaseException as e:
+            error = "Client disconnected" if isinstance(e, ClientDisconnect) else (str(e) or type(e).__name__)
+            raise
+        finally:
+            bulk_progress.finish(error)
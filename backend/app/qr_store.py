@@ -0,0 +1,122 @@
+"""
+Content-addressed storage of rendered QR images.
+
+A QR image depends only on its token (and the fixed render size), so it
+is stored as storage/barcodes/qr_<hash>.png, where the hash also serves
+as its ETag. A regenerated token gets a new file name, so a stored or
+cached image never goes stale. Recently served PNGs are kept in an
+in-memory LRU; misses read the file, or render and save it.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+from .barcode import qr_png_bytes, write_file_atomic
+from .config import get_settings
+
+settings = get_settings()
+
+QR_SIZE = 400
+QR_PREFIX = "qr_"
+
+
+def qr_key(token: str) -> str:
+    """Hash identifying the rendered image of a token."""
+    return hashlib.sha256(f"{QR_SIZE}:{token}".encode("utf-8")).hexdigest()[:32]
+
+
+def qr_filepath(token: str) -> str:
+    return os.path.join(settings.STORAGE_PATH, "barcodes", f"{QR_PREFIX}{qr_key(token)}.png")
+
+
+class QrImageCache:
+    """Bounded LRU of rendered PNG bytes, keyed by qr_key."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            png = self._entries.get(key)
+            if png is not None:
+                self._entries.move_to_end(key)
+            return png
+
+    def put(self, key: str, png: bytes) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = png
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+qr_image_cache = QrImageCache(settings.QR_IMAGE_CACHE_SIZE)
+
+
+def save_qr_png(token: str, png: bytes) -> None:
+    """Store an image rendered elsewhere (e.g. by the bulk process pool)."""
+    os.makedirs(os.path.dirname(qr_filepath(token)), exist_ok=True)
+    write_file_atomic(qr_filepath(token), png)
+
+
+def get_qr_png(token: str) -> Tuple[str, bytes]:
+    """
+    (ETag key, PNG bytes) of a token's QR image: from memory, else from
+    storage, else rendered and saved. Blocking; call it off the event loop.
+    """
+    key = qr_key(token)
+    png = qr_image_cache.get(key)
+    if png is None:
+        filepath = qr_filepath(token)
+        try:
+            with open(filepath, "rb") as f:
+                png = f.read()
+        except FileNotFoundError:
+            png = qr_png_bytes(token, QR_SIZE)
+            save_qr_png(token, png)
+        qr_image_cache.put(key, png)
+    return key, png
+
+
+def remove_qr_png(token: str) -> None:
+    """Delete the stored image of a token that is no longer valid."""
+    try:
+        os.remove(qr_filepath(token))
+    except FileNotFoundError:
+        pass
+
+
+class StorageFiles(StaticFiles):
+    """
+    The /storage mount with cache headers. Content-addressed QR images are
+    immutable (their hash is the ETag); other files, such as photos, must
+    be revalidated on every use and answer 304 when unchanged.
+    """
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+        name = os.path.basename(full_path)
+        if name.startswith(QR_PREFIX) and name.endswith(".png"):
+            response.headers["etag"] = f'"{name[len(QR_PREFIX):-len(".png")]}"'
+            response.headers["cache-control"] = "public, max-age=31536000, immutable"
+        else:
+            response.headers["cache-control"] = "no-cache"
+
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -0,0 +1,293 @@
+"""
+Streaming exports of the semester report and the monthly class grid
+(CSV and XLSX).
+
+Rows are read from the database in batches (Query.yield_per) and written
+out as they arrive, so memory stays flat however many students are
+exported. CSV is produced line by line. XLSX goes through an openpyxl
+write-only workbook, which spools each sheet to a temporary file, and the
+finished file is sent in chunks.
+"""
+import csv
+import io
+import tempfile
+from datetime import date
+from typing import Dict, Iterable, Iterator, List, Optional
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from .class_matrix import ClassMatrix
+from .timezone_utils import get_wib_now
+
+STATUS_COLUMNS = ['Hadir', 'Terlambat', 'Sakit', 'Izin', 'Alpha']
+# Cell letters of the monthly grid, in STATUS_COLUMNS order
+STATUS_LETTERS = ['H', 'T', 'S', 'I', 'A']
+MONTH_NAMES = [
+    'Januari', 'Februari', 'Maret', 'April', 'Mei', 'Juni',
+    'Juli', 'Agustus', 'September', 'Oktober', 'November', 'Desember',
+]
+CHUNK_SIZE = 64 * 1024
+
+
+def attendance_percentage(present: int, late: int, sick: int, permission: int, absent: int) -> float:
+    """Share of recorded days the student attended (Present or Late), rounded to 2 decimals."""
+    total_records = present + late + sick + permission + absent
+    if total_records == 0:
+        return 0.0
+    return round((present + late) / total_records * 100, 2)
+
+
+def semester_label(semester: int) -> str:
+    return 'Semester 1 (Juli - Desember)' if semester == 1 else 'Semester 2 (Januari - Juni)'
+
+
+def academic_year_label(semester: int, year: int) -> str:
+    """Semester 1 of 2025 belongs to 2025/2026, semester 2 of 2025 to 2024/2025."""
+    start = year if semester == 1 else year - 1
+    return f"{start}/{start + 1}"
+
+
+def export_filename(semester: int, year: int, class_name: Optional[str], extension: str) -> str:
+    label = (class_name or 'Semua-Kelas').replace('/', '-').replace('\\', '-')
+    academic_year = academic_year_label(semester, year).replace('/', '-')
+    return f"Laporan_Absensi_{label}_Semester-{semester}_{academic_year}.{extension}"
+
+
+def _counts(row) -> List[int]:
+    return [
+        row.total_present or 0,
+        row.total_late or 0,
+        row.total_sick or 0,
+        row.total_permission or 0,
+        row.total_absent or 0,
+    ]
+
+
+def _csv_encode(lines: Iterable[list]) -> Iterator[bytes]:
+    """CSV (UTF-8 with BOM for Excel), one encoded chunk per ~64 KB of lines."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    for line in lines:
+        writer.writerow(line)
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue().encode('utf-8')
+
+
+def csv_chunks(rows: Iterable) -> Iterator[bytes]:
+    """The semester report rows as CSV."""
+    def lines():
+        yield ['No', 'NIS', 'Nama Siswa', 'Kelas'] + STATUS_COLUMNS + ['Total Hari', 'Persentase (%)']
+        for number, row in enumerate(rows, start=1):
+            counts = _counts(row)
+            yield (
+                [number, row.student_id, row.student_name, row.class_name]
+                + counts
+                + [sum(counts), attendance_percentage(*counts)]
+            )
+    return _csv_encode(lines())
+
+
+class _Totals:
+    """Running status totals for a class or the whole export."""
+
+    def __init__(self):
+        self.students = 0
+        self.counts = [0] * len(STATUS_COLUMNS)
+        self.percentage_sum = 0.0
+
+    def add(self, counts: List[int], percentage: float) -> None:
+        self.students += 1
+        self.counts = [total + count for total, count in zip(self.counts, counts)]
+        self.percentage_sum += percentage
+
+    @property
+    def average_percentage(self) -> float:
+        return round(self.percentage_sum / self.students, 2) if self.students else 0.0
+
+
+class _SheetWriter:
+    """Title block, header, student rows and closing summary of one report sheet."""
+
+    def __init__(self, workbook: Workbook, title: str, heading: List[str], with_class: bool):
+        self.sheet = workbook.create_sheet(title=_sheet_title(title))
+        self.with_class = with_class
+        self.totals = _Totals()
+
+        widths = [5, 14, 28] + ([10] if with_class else []) + [8, 10, 8, 8, 8, 10, 14]
+        for index, width in enumerate(widths):
+            self.sheet.column_dimensions[chr(ord('A') + index)].width = width
+
+        self.sheet.append([self._bold('LAPORAN ABSENSI SISWA')])
+        for line in heading:
+            self.sheet.append([line])
+        self.sheet.append([])
+        columns = ['No', 'NIS', 'Nama Siswa'] + (['Kelas'] if with_class else []) + STATUS_COLUMNS
+        self.sheet.append([self._bold(column) for column in columns + ['Total Hari', 'Persentase (%)']])
+
+    def _bold(self, value):
+        cell = WriteOnlyCell(self.sheet, value=value)
+        cell.font = Font(bold=True)
+        return cell
+
+    def add(self, row) -> None:
+        counts = _counts(row)
+        percentage = attendance_percentage(*counts)
+        self.totals.add(counts, percentage)
+
+        percentage_cell = WriteOnlyCell(self.sheet, value=percentage)
+        percentage_cell.number_format = '0.00'
+        self.sheet.append(
+            [self.totals.students, row.student_id, row.student_name]
+            + ([row.class_name] if self.with_class else [])
+            + counts
+            + [sum(counts), percentage_cell]
+        )
+
+    def close(self, label: str) -> None:
+        self.sheet.append([])
+        self.sheet.append([self._bold(label)])
+        self.sheet.append(['Total Siswa', self.totals.students])
+        for column, total in zip(STATUS_COLUMNS, self.totals.counts):
+            self.sheet.append([f"Total {column}", total])
+        self.sheet.append(['Total Hari Absensi', sum(self.totals.counts)])
+        self.sheet.append(['Rata-rata Kehadiran (%)', self.totals.average_percentage])
+
+
+def _sheet_title(name: str) -> str:
+    """Excel sheet names: at most 31 characters, without : \\ / ? * [ ]."""
+    for char in ':\\/?*[]':
+        name = name.replace(char, '-')
+    return name[:31] or 'Sheet'
+
+
+def write_xlsx(rows: Iterable, target, semester: int, year: int,
+               class_filter: Optional[str], per_class: bool) -> None:
+    """
+    Write the report rows (ordered by class) to `target` as XLSX.
+    per_class puts every class on its own sheet; otherwise all students
+    share one sheet with a class column. A summary sheet comes last.
+    """
+    workbook = Workbook(write_only=True)
+    common = [
+        f"Semester: {semester_label(semester)}",
+        f"Tahun Ajaran: {academic_year_label(semester, year)}",
+        f"Tanggal Cetak: {get_wib_now().strftime('%d-%m-%Y')}",
+    ]
+    grand = _Totals()
+    classes: Dict[str, _Totals] = {}
+
+    sheet: Optional[_SheetWriter] = None
+    current_class = None
+    for row in rows:
+        if sheet is None or (per_class and row.class_name != current_class):
+            if sheet is not None:
+                sheet.close('RINGKASAN KELAS')
+            current_class = row.class_name
+            if per_class:
+                sheet = _SheetWriter(workbook, current_class, [f"Kelas: {current_class}"] + common, False)
+            else:
+                sheet = _SheetWriter(workbook, 'Laporan', [f"Kelas: {class_filter or 'Semua Kelas'}"] + common, True)
+        sheet.add(row)
+
+        counts = _counts(row)
+        percentage = attendance_percentage(*counts)
+        grand.add(counts, percentage)
+        classes.setdefault(row.class_name, _Totals()).add(counts, percentage)
+
+    if sheet is not None:
+        sheet.close('RINGKASAN KELAS' if per_class else 'RINGKASAN')
+
+    summary = workbook.create_sheet(title='Ringkasan')
+    summary.column_dimensions['A'].width = 25
+    summary.column_dimensions['B'].width = 15
+    summary.append(['RINGKASAN KESELURUHAN'])
+    summary.append([common[0]])
+    summary.append([common[1]])
+    summary.append([f"Filter: {class_filter or 'Semua Kelas'}"])
+    summary.append([])
+    summary.append(['Total Kelas', len(classes)])
+    summary.append(['Total Siswa', grand.students])
+    summary.append([])
+    summary.append(['Kelas', 'Siswa'] + STATUS_COLUMNS + ['Rata-rata Kehadiran (%)'])
+    for class_name in sorted(classes):
+        totals = classes[class_name]
+        summary.append([class_name, totals.students] + totals.counts + [totals.average_percentage])
+    summary.append(['Total', grand.students] + grand.counts + [grand.average_percentage])
+
+    workbook.save(target)
+
+
+def _file_chunks(write) -> Iterator[bytes]:
+    """Run `write(target)` into a temporary file, then stream the file in chunks."""
+    with tempfile.TemporaryFile() as target:
+        write(target)
+        target.seek(0)
+        while True:
+            chunk = target.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+def xlsx_chunks(rows: Iterable, semester: int, year: int,
+                class_filter: Optional[str], per_class: bool) -> Iterator[bytes]:
+    """The semester report rows as XLSX."""
+    return _file_chunks(lambda target: write_xlsx(rows, target, semester, year, class_filter, per_class))
+
+
+def month_label(month: date) -> str:
+    return f"{MONTH_NAMES[month.month - 1]} {month.year}"
+
+
+def matrix_filename(class_name: str, month: date, extension: str) -> str:
+    label = class_name.replace('/', '-').replace('\\', '-')
+    return f"Rekap_Absensi_{label}_{month.strftime('%Y-%m')}.{extension}"
+
+
+def _matrix_lines(matrix: ClassMatrix) -> Iterator[list]:
+    """Header, one line per student (status letters per day, then totals) and per-status day totals."""
+    yield ['No', 'NIS', 'Nama Siswa'] + [day.day for day in matrix.days] + STATUS_COLUMNS
+    for index, (student, totals) in enumerate(zip(matrix.students, matrix.student_totals())):
+        letters = [STATUS_LETTERS[code - 1] if code else '' for code in matrix.row(index)]
+        yield [index + 1, student.nis, student.name] + letters + totals
+
+    day_totals = matrix.day_totals()
+    for position, column in enumerate(STATUS_COLUMNS):
+        yield ['', '', f"Jumlah {column}"] + [day[position] for day in day_totals]
+
+
+def matrix_csv_chunks(matrix: ClassMatrix) -> Iterator[bytes]:
+    """The monthly class grid as CSV."""
+    return _csv_encode(_matrix_lines(matrix))
+
+
+def write_matrix_xlsx(matrix: ClassMatrix, target) -> None:
+    """Write the monthly class grid to `target` as a one-sheet XLSX."""
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=_sheet_title(matrix.class_name))
+    sheet.column_dimensions['A'].width = 5
+    sheet.column_dimensions['B'].width = 14
+    sheet.column_dimensions['C'].width = 28
+
+    for line in [
+        'REKAP ABSENSI BULANAN',
+        f"Kelas: {matrix.class_name}",
+        f"Bulan: {month_label(matrix.month)}",
+        'Keterangan: ' + ', '.join(f"{letter} = {column}" for letter, column in zip(STATUS_LETTERS, STATUS_COLUMNS)),
+    ]:
+        sheet.append([line])
+    sheet.append([])
+    for line in _matrix_lines(matrix):
+        sheet.append(line)
+
+    workbook.save(target)
+
+
+def matrix_xlsx_chunks(matrix: ClassMatrix) -> Iterator[bytes]:
+    """The monthly class grid as XLSX."""
+    return _file_chunks(lambda target: write_matrix_xlsx(matrix, target))
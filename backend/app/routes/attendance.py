@@ -1,24 +1,174 @@
 """
 Attendance routes for scanning, undo, and history.
 """
+import asyncio
+import json
 from datetime import datetime, timedelta, date
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from typing import Iterable, Iterator, List, Optional, Union
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Body, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
-from ..database import get_db
+from sqlalchemy import func, and_, case, tuple_
+from ..database import get_db, SessionLocal
 from ..schemas import (
-    AttendanceScan, AttendanceResponse, ScanResult, AttendanceStats,
+    AttendanceScan, AttendanceScanItem, AttendanceResponse, ScanResult, AttendanceStats,
     BatchAttendanceUpdate, StudentAttendanceStatus
 )
-from ..models import Student, Attendance, User, ClassSchedule
-from ..auth import get_current_user, get_teacher_classes
+from ..models import Student, Attendance, AttendanceDailySummary, User, ClassSchedule
+from ..auth import get_current_user, get_teacher_classes, get_user_from_token, require_admin
 from ..barcode import verify_token
-from ..timezone_utils import get_wib_now, to_wib
+from ..timezone_utils import get_wib_now, to_wib, from_wib_to_utc, wib_date, WIB
+from ..scan_queue import ScanQueueStopped, scan_queue
+from ..attendance_store import insert_attendance, upsert_attendance
+from ..presence import presence_index
+from ..schedule_cache import schedule_cache
+from ..summaries import count_attendance
+from ..pagination import MAX_PAGE_SIZE, encode_cursor, decode_cursor
+from ..config import get_settings
 
+settings = get_settings()
 router = APIRouter(prefix="/api/attendance", tags=["Attendance"])
 
 
+MAX_SCAN_BATCH = 500
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+# Rows fetched per round trip (and sent per chunk) while streaming history
+HISTORY_STREAM_BATCH = 1000
+
+
+def _token_matches(student: Optional[Student], payload: dict) -> bool:
+    """A regenerated QR code revokes tokens carrying the old nonce."""
+    if not student:
+        return False
+    return not student.barcode_nonce or payload["nonce"] == student.barcode_nonce
+
+
+def _success_result(student: Student, attendance_id: int) -> ScanResult:
+    return ScanResult(
+        success=True,
+        message=f"Absensi berhasil untuk {student.name}",
+        student_name=student.name,
+        student_class=student.class_name,
+        student_photo_url=f"/api/students/{student.id}/photo" if student.photo_path else None,
+        attendance_id=attendance_id,
+        already_scanned=False
+    )
+
+
+def _already_scanned_result(student: Student, attendance_id: int) -> ScanResult:
+    return ScanResult(
+        success=False,
+        message=f"{student.name} sudah melakukan absensi hari ini",
+        student_name=student.name,
+        student_class=student.class_name,
+        student_photo_url=f"/api/students/{student.id}/photo" if student.photo_path else None,
+        already_scanned=True,
+        attendance_id=attendance_id
+    )
+
+
+def _client_scan_time(scanned_at_client: Optional[datetime], now_wib: datetime) -> datetime:
+    """
+    Scan time reported by an offline scanner, as WIB. Naive values are taken
+    as WIB; future values are clamped. Raises ValueError for scans older than
+    SCAN_REPLAY_MAX_AGE_HOURS, so a stale queue cannot write past days.
+    """
+    if scanned_at_client is None:
+        return now_wib
+    if scanned_at_client.tzinfo is None:
+        scanned_at = WIB.localize(scanned_at_client)
+    else:
+        scanned_at = to_wib(scanned_at_client)
+    max_age = settings.SCAN_REPLAY_MAX_AGE_HOURS
+    if scanned_at < now_wib - timedelta(hours=max_age):
+        raise ValueError(
+            f"Scan time {scanned_at:%Y-%m-%d %H:%M} WIB is older than the {max_age}-hour replay window"
+        )
+    return min(scanned_at, now_wib)
+
+
+def _check_scan(db: Session, token: str, allowed_classes) -> Union[ScanResult, Student]:
+    """
+    Verify a QR token and resolve its student.
+    Returns the Student when a new attendance should be recorded, otherwise
+    the final ScanResult. Raises ValueError for tokens that fail verification.
+    """
+    payload = verify_token(token)
+    student_id = int(payload["sid"])
+    student = db.query(Student).filter(Student.id == student_id).first()
+    
+    if not _token_matches(student, payload):
+        return ScanResult(
+            success=False,
+            message="Student not found or token expired"
+        )
+    
+    if allowed_classes is not None and student.class_name not in allowed_classes:
+        return ScanResult(
+            success=False,
+            message=f"Access denied to class {student.class_name}"
+        )
+    
+    existing_id = presence_index.lookup(db, student.id)
+    if existing_id is not None:
+        return _already_scanned_result(student, existing_id)
+    
+    return student
+
+
+def _insert_scan(db: Session, student: Student, scanned_at: datetime) -> ScanResult:
+    """
+    Record the student's attendance for the day of `scanned_at`.
+    A concurrent scan that won the race resolves as already scanned.
+    """
+    key = (student.id, wib_date(scanned_at))
+    scan_status = schedule_cache.scan_status(db, student.class_name, scanned_at)
+    attendance_id, inserted = insert_attendance(db, [(student.id, scanned_at, scan_status)])[key]
+    # Build the result before the commit expires `student`
+    if inserted:
+        result = _success_result(student, attendance_id)
+    else:
+        result = _already_scanned_result(student, attendance_id)
+    db.commit()
+    presence_index.mark_present(key[0], attendance_id, key[1])
+    return result
+
+
+async def _perform_scan(db: Session, token: str, allowed_classes) -> ScanResult:
+    """
+    Verify a QR token and record today's attendance for its student.
+    Shared by POST /scan and the WebSocket channel. Database work runs in
+    the threadpool so a slow query never stalls the event loop.
+    Raises ValueError for tokens that fail verification.
+    """
+    checked = await run_in_threadpool(_check_scan, db, token, allowed_classes)
+    if isinstance(checked, ScanResult):
+        return checked
+    student = checked
+    
+    now_wib = get_wib_now()
+    
+    if not scan_queue.is_running:
+        return await run_in_threadpool(_insert_scan, db, student, now_wib)
+    
+    # Group commit: wait for the batch holding this scan to be written.
+    # Give the connection back first, or waiting requests could hold every
+    # pooled connection while the flusher needs one.
+    scan_status = await run_in_threadpool(schedule_cache.scan_status, db, student.class_name, now_wib)
+    db.close()
+    try:
+        queued = scan_queue.submit(student.id, now_wib, scan_status)
+    except ScanQueueStopped:
+        # Stopped since the check above (shutdown); write the scan directly
+        return await run_in_threadpool(_insert_scan, db, student, now_wib)
+    attendance_id, already_scanned = await asyncio.wrap_future(queued)
+    presence_index.mark_present(student.id, attendance_id, now_wib.date())
+    if already_scanned:
+        return _already_scanned_result(student, attendance_id)
+    return _success_result(student, attendance_id)
+
 
 @router.post("/scan", response_model=ScanResult)
 async def scan_attendance(
@@ -31,65 +181,8 @@ async def scan_attendance(
     Teachers can only scan students from assigned classes.
     """
     try:
-        payload = verify_token(scan_data.token)
-        student_id = int(payload["sid"])
-        student = db.query(Student).filter(Student.id == student_id).first()
-        
-        if not student:
-            return ScanResult(
-                success=False,
-                message="Student not found or token expired"
-            )
-        
-        allowed_classes = get_teacher_classes(current_user, db)
-        if allowed_classes is not None and student.class_name not in allowed_classes:
-            return ScanResult(
-                success=False,
-                message=f"Access denied to class {student.class_name}"
-            )
-        
-        now_wib = get_wib_now()
-        today_start = now_wib.replace(hour=0, minute=0, second=0, microsecond=0)
-        today_end = today_start + timedelta(days=1)
-        
-        existing = db.query(Attendance).filter(
-            and_(
-                Attendance.student_id == student.id,
-                Attendance.scanned_at >= today_start,
-                Attendance.scanned_at < today_end,
-                Attendance.is_undone == False
-            )
-        ).first()
-        
-        if existing:
-            return ScanResult(
-                success=False,
-                message=f"{student.name} sudah melakukan absensi hari ini",
-                student_name=student.name,
-                student_class=student.class_name,
-                student_photo_url=f"/api/students/{student.id}/photo" if student.photo_path else None,
-                already_scanned=True,
-                attendance_id=existing.id
-            )
-        
-        attendance = Attendance(
-            student_id=student.id,
-            scanned_at=now_wib,
-            status='Present'
-        )
-        db.add(attendance)
-        db.commit()
-        db.refresh(attendance)
-        
-        return ScanResult(
-            success=True,
-            message=f"Absensi berhasil untuk {student.name}",
-            student_name=student.name,
-            student_class=student.class_name,
-            student_photo_url=f"/api/students/{student.id}/photo" if student.photo_path else None,
-            attendance_id=attendance.id,
-            already_scanned=False
-        )
+        allowed_classes = await run_in_threadpool(get_teacher_classes, current_user, db)
+        return await _perform_scan(db, scan_data.token, allowed_classes)
         
     except ValueError as e:
         return ScanResult(
@@ -100,8 +193,150 @@ async def scan_attendance(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _authenticate_scanner(token: str) -> Optional[frozenset]:
+    """Resolve a WebSocket access token to the user's allowed classes (None for admin)."""
+    db = SessionLocal()
+    try:
+        user = get_user_from_token(token, db)
+        allowed_classes = get_teacher_classes(user, db)
+    finally:
+        db.close()
+    return frozenset(allowed_classes) if allowed_classes is not None else None
+
+
+@router.websocket("/ws")
+async def scan_websocket(websocket: WebSocket, token: Optional[str] = None):
+    """
+    Persistent scan channel for scanner devices.
+    
+    Connect with ?token=<access token>. The user and their allowed classes
+    are resolved once per connection. Each message is
+    {"id": <client ref>, "token": <QR token>} and is answered with a
+    ScanResult frame carrying the same "id". Several scans may be in flight
+    at once; replies arrive as each scan completes. A frame that is not
+    JSON text gets a failed ScanResult with "id": null.
+    """
+    try:
+        allowed_classes = await run_in_threadpool(_authenticate_scanner, token or "")
+    except HTTPException as e:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=str(e.detail))
+        return
+    
+    await websocket.accept()
+    send_lock = asyncio.Lock()
+    in_flight = set()
+    
+    async def handle(message: dict):
+        ref = message.get("id")
+        scan_db = SessionLocal()
+        try:
+            result = await _perform_scan(scan_db, str(message.get("token") or ""), allowed_classes)
+        except ValueError as e:
+            result = ScanResult(success=False, message=str(e))
+        except Exception as e:
+            result = ScanResult(success=False, message=f"Internal error: {e}")
+        finally:
+            scan_db.close()
+        async with send_lock:
+            await websocket.send_json({"id": ref, **result.model_dump()})
+    
+    try:
+        while True:
+            try:
+                message = await websocket.receive_json()
+            except (ValueError, KeyError, TypeError) as e:
+                # Malformed JSON or a binary frame; report it and keep the connection
+                reason = str(e) if isinstance(e, ValueError) else "expected a JSON text frame"
+                result = ScanResult(success=False, message=f"Invalid message: {reason}")
+                async with send_lock:
+                    await websocket.send_json({"id": None, **result.model_dump()})
+                continue
+            if not isinstance(message, dict):
+                message = {"token": message}
+            task = asyncio.create_task(handle(message))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+    except WebSocketDisconnect:
+        for task in in_flight:
+            task.cancel()
+
+
+@router.post("/scan-batch", response_model=List[ScanResult])
+def scan_attendance_batch(
+    items: List[AttendanceScanItem] = Body(..., max_length=MAX_SCAN_BATCH),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Replay scans buffered by an offline scanner in a single request.
+    Students are resolved with one query and all new records are written
+    in one transaction. Returns one ScanResult per item, in input order.
+    Items scanned more than SCAN_REPLAY_MAX_AGE_HOURS ago are rejected.
+    """
+    now_wib = get_wib_now()
+    results: List[Optional[ScanResult]] = [None] * len(items)
+    
+    payloads = {}
+    for i, item in enumerate(items):
+        try:
+            payloads[i] = verify_token(item.token)
+        except ValueError as e:
+            results[i] = ScanResult(success=False, message=str(e))
+    
+    student_ids = {int(payload["sid"]) for payload in payloads.values()}
+    students = {
+        student.id: student
+        for student in db.query(Student).filter(Student.id.in_(student_ids)).all()
+    } if student_ids else {}
+    
+    allowed_classes = get_teacher_classes(current_user, db)
+    
+    accepted = []  # (index, student, scanned_at)
+    for i, payload in payloads.items():
+        student = students.get(int(payload["sid"]))
+        if not _token_matches(student, payload):
+            results[i] = ScanResult(success=False, message="Student not found or token expired")
+            continue
+        if allowed_classes is not None and student.class_name not in allowed_classes:
+            results[i] = ScanResult(success=False, message=f"Access denied to class {student.class_name}")
+            continue
+        try:
+            scanned_at = _client_scan_time(items[i].scanned_at_client, now_wib)
+        except ValueError as e:
+            results[i] = ScanResult(success=False, message=str(e))
+            continue
+        accepted.append((i, student, scanned_at))
+    
+    if not accepted:
+        return results
+    
+    try:
+        recorded = insert_attendance(db, [
+            (student.id, scanned_at, schedule_cache.scan_status(db, student.class_name, scanned_at))
+            for _, student, scanned_at in accepted
+        ])
+        reported = set()
+        for i, student, scanned_at in accepted:
+            key = (student.id, wib_date(scanned_at))
+            attendance_id, inserted = recorded[key]
+            if inserted and key not in reported:
+                results[i] = _success_result(student, attendance_id)
+                reported.add(key)
+            else:
+                results[i] = _already_scanned_result(student, attendance_id)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    for key, (attendance_id, _) in recorded.items():
+        presence_index.mark_present(key[0], attendance_id, key[1])
+    
+    return results
+
+
 @router.post("/{attendance_id}/undo")
-async def undo_attendance(
+def undo_attendance(
     attendance_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -137,7 +372,7 @@ async def undo_attendance(
         )
     
     now_wib = get_wib_now()
-    time_elapsed = (now_wib - attendance.scanned_at).total_seconds()
+    time_elapsed = (now_wib - from_wib_to_utc(attendance.scanned_at)).total_seconds()
     
     if time_elapsed > 10:
         raise HTTPException(
@@ -145,10 +380,14 @@ async def undo_attendance(
             detail="Undo period expired (max 10 seconds)"
         )
     
+    student_id, scanned_day = student.id, attendance.attendance_date
+    
+    count_attendance(db, [attendance_id], sign=-1)
     attendance.is_undone = True
     attendance.undone_at = now_wib  
     
     db.commit()
+    presence_index.mark_absent(student_id, scanned_day)
     
     return {
         "message": "Attendance undone successfully",
@@ -156,64 +395,187 @@ async def undo_attendance(
     }
 
 
+def _parse_day(value: str, name: str) -> date:
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid {name} format. Use YYYY-MM-DD"
+        )
+
+
+def _history_total(
+    db: Session,
+    classes: Optional[Iterable[str]],
+    student_id: Optional[int],
+    start: Optional[datetime],
+    end: Optional[datetime]
+) -> int:
+    """
+    Number of history records matching the filters, with the same predicate
+    as _history_query, so it always agrees with the rows listed. Counted in
+    the scanned_at (or per-student) indexes.
+    """
+    query = db.query(func.count(Attendance.id))
+    if classes is not None:
+        query = query.join(Student, Student.id == Attendance.student_id).filter(
+            Student.class_name.in_(list(classes))
+        )
+    if start is not None:
+        query = query.filter(Attendance.scanned_at >= start)
+    if end is not None:
+        query = query.filter(Attendance.scanned_at < end)
+    if student_id:
+        query = query.filter(Attendance.student_id == student_id)
+    return query.scalar()
+
+
+def _history_query(
+    db: Session,
+    classes: Optional[Iterable[str]],
+    student_id: Optional[int],
+    start: Optional[datetime],
+    end: Optional[datetime],
+    after: Optional[tuple]
+):
+    """History rows matching the filters, newest first, after the (scanned_at, id) key `after`."""
+    # Only the response columns, already named like AttendanceResponse
+    query = db.query(
+        Attendance.id,
+        Attendance.student_id,
+        Student.name.label('student_name'),
+        Student.class_name.label('student_class'),
+        Attendance.scanned_at,
+        Attendance.status,
+        Attendance.is_undone,
+        Attendance.undone_at
+    ).join(Student, Student.id == Attendance.student_id)
+    
+    if classes is not None:
+        query = query.filter(Student.class_name.in_(list(classes)))
+    
+    # Plain ranges on scanned_at, so the scanned_at indexes serve both the filter and the order
+    if start is not None:
+        query = query.filter(Attendance.scanned_at >= start)
+    if end is not None:
+        query = query.filter(Attendance.scanned_at < end)
+    
+    if student_id:
+        query = query.filter(Attendance.student_id == student_id)
+    
+    if after is not None:
+        query = query.filter(tuple_(Attendance.scanned_at, Attendance.id) < after)
+    
+    return query.order_by(Attendance.scanned_at.desc(), Attendance.id.desc())
+
+
+def _stream_history(*filters) -> Iterator[str]:
+    """
+    NDJSON lines of every history row matching `filters` (see _history_query),
+    read through a server-side cursor in batches of HISTORY_STREAM_BATCH.
+    """
+    # The request session is closed once the response starts; the stream
+    # reads through its own session
+    db = SessionLocal()
+    try:
+        query = _history_query(db, *filters).yield_per(HISTORY_STREAM_BATCH)
+        lines = []
+        for row in query:
+            lines.append(json.dumps(row._asdict(), default=datetime.isoformat))
+            if len(lines) == HISTORY_STREAM_BATCH:
+                yield "\n".join(lines) + "\n"
+                lines = []
+        if lines:
+            yield "\n".join(lines) + "\n"
+    finally:
+        db.close()
+
+
 @router.get("/history", response_model=List[AttendanceResponse])
-async def get_attendance_history(
+def get_attendance_history(
+    request: Request,
+    response: Response,
     date: Optional[str] = Query(None, description="Filter by date (YYYY-MM-DD)"),
+    date_from: Optional[str] = Query(None, alias="from", description="From date, inclusive (YYYY-MM-DD)"),
+    date_to: Optional[str] = Query(None, alias="to", description="To date, inclusive (YYYY-MM-DD)"),
+    class_name: Optional[str] = Query(None, description="Filter by class"),
     student_id: Optional[int] = Query(None, description="Filter by student ID"),
-    skip: int = 0,
-    limit: int = 100,
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    include_total: bool = Query(False, description="Send the number of matching records in X-Total-Count"),
+    stream: bool = Query(False, description="Stream every matching record as NDJSON"),
+    skip: int = Query(0, ge=0, description="Offset paging (deprecated, use cursor)"),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get attendance history with class access filtering for teachers."""
+    """
+    Get attendance history, newest first, with class access filtering for teachers.
     
-    query = db.query(Attendance).join(Student)
+    Pages are keyed on (scanned_at, id): when more records follow, the
+    X-Next-Cursor header holds the cursor for the next page.
     
-    allowed_classes = get_teacher_classes(current_user, db)
-    if allowed_classes is not None:  # Teacher
-        query = query.filter(Student.class_name.in_(allowed_classes))
+    With `Accept: application/x-ndjson` or `?stream=1` every matching record
+    (after `cursor`, ignoring skip and limit) is streamed as one JSON object
+    per line, for bulk pulls.
+    """
+    
+    classes = get_teacher_classes(current_user, db)
+    if class_name:
+        if classes is not None and class_name not in classes:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"Access denied to class {class_name}"
+            )
+        classes = [class_name]
+    if classes is not None:
+        classes = list(classes)
     
     if date:
+        date_from = date_to = date
+    start = datetime.combine(_parse_day(date_from, "from"), datetime.min.time()) if date_from else None
+    end = datetime.combine(_parse_day(date_to, "to") + timedelta(days=1), datetime.min.time()) if date_to else None
+    
+    after = None
+    if cursor:
+        scanned_at, attendance_id = decode_cursor(cursor, 2)
         try:
-            date_obj = datetime.strptime(date, "%Y-%m-%d")
-            date_start = date_obj.replace(hour=0, minute=0, second=0, microsecond=0)
-            date_end = date_start + timedelta(days=1)
-            query = query.filter(
-                and_(
-                    Attendance.scanned_at >= date_start,
-                    Attendance.scanned_at < date_end
-                )
-            )
-        except ValueError:
+            after = (datetime.fromisoformat(scanned_at), int(attendance_id))
+        except (TypeError, ValueError):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid date format. Use YYYY-MM-DD"
+                detail="Invalid cursor"
             )
     
-    if student_id:
-        query = query.filter(Attendance.student_id == student_id)
+    headers = {}
+    if include_total:
+        headers["X-Total-Count"] = str(_history_total(db, classes, student_id, start, end))
     
-    query = query.order_by(Attendance.scanned_at.desc())
+    if stream or NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+        return StreamingResponse(
+            _stream_history(classes, student_id, start, end, after),
+            media_type=NDJSON_MEDIA_TYPE,
+            headers=headers
+        )
+    response.headers.update(headers)
     
-    attendances = query.offset(skip).limit(limit).all()
+    query = _history_query(db, classes, student_id, start, end, after)
+    if skip and not cursor:
+        query = query.offset(skip)
     
-    result = []
-    for att in attendances:
-        result.append(AttendanceResponse(
-            id=att.id,
-            student_id=att.student_id,
-            student_name=att.student.name,
-            student_class=att.student.class_name,
-            scanned_at=att.scanned_at,
-            is_undone=att.is_undone,
-            undone_at=att.undone_at
-        ))
+    # One extra row tells whether another page follows
+    attendances = query.limit(limit + 1).all()
+    if len(attendances) > limit:
+        attendances = attendances[:limit]
+        last = attendances[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(last.scanned_at, last.id)
     
-    return result
+    # Rows are validated against the response model in one pass
+    return attendances
 
 
 @router.get("/stats", response_model=AttendanceStats)
-async def get_attendance_stats(
+def get_attendance_stats(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -223,48 +585,31 @@ async def get_attendance_stats(
     
     allowed_classes = get_teacher_classes(current_user, db)
     
-    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-    today_end = today_start + timedelta(days=1)
-    
-    def build_query():
-        query = db.query(func.count(Attendance.id)).join(Student)
-        if allowed_classes is not None:  # Teacher
-            query = query.filter(Student.class_name.in_(allowed_classes))
-        return query
+    today = now.date()
     
-    total_today = build_query().filter(
-        and_(
-            Attendance.scanned_at >= today_start,
-            Attendance.scanned_at < today_end,
-            Attendance.is_undone == False
-        )
-    ).scalar()
-    
-    days_since_monday = now.weekday()
-    week_start = (now - timedelta(days=days_since_monday)).replace(hour=0, minute=0, second=0, microsecond=0)
+    week_start = today - timedelta(days=today.weekday())
     week_end = week_start + timedelta(days=7)
     
-    total_this_week = build_query().filter(
-        and_(
-            Attendance.scanned_at >= week_start,
-            Attendance.scanned_at < week_end,
-            Attendance.is_undone == False
-        )
-    ).scalar()
-    
-    month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    if now.month == 12:
-        month_end = month_start.replace(year=now.year + 1, month=1)
+    month_start = today.replace(day=1)
+    if today.month == 12:
+        month_end = month_start.replace(year=today.year + 1, month=1)
     else:
-        month_end = month_start.replace(month=now.month + 1)
-    
-    total_this_month = build_query().filter(
-        and_(
-            Attendance.scanned_at >= month_start,
-            Attendance.scanned_at < month_end,
-            Attendance.is_undone == False
-        )
-    ).scalar()
+        month_end = month_start.replace(month=today.month + 1)
+    
+    # One range sum over the daily counters (a few rows per class per day)
+    day = AttendanceDailySummary.attendance_date
+    count = AttendanceDailySummary.count
+    summary_query = db.query(
+        func.sum(case((day == today, count), else_=0)),
+        func.sum(case((and_(day >= week_start, day < week_end), count), else_=0)),
+        func.sum(case((and_(day >= month_start, day < month_end), count), else_=0)),
+    ).filter(
+        day >= min(week_start, month_start),
+        day < max(week_end, month_end)
+    )
+    if allowed_classes is not None:  # Teacher
+        summary_query = summary_query.filter(AttendanceDailySummary.class_name.in_(allowed_classes))
+    total_today, total_this_week, total_this_month = summary_query.one()
     
     student_query = db.query(func.count(Student.id))
     if allowed_classes is not None:  # Teacher
@@ -279,8 +624,14 @@ async def get_attendance_stats(
     )
 
 
-@router.get("/class-attendance")
-async def get_class_attendance(
+@router.get("/presence-index", dependencies=[Depends(require_admin)])
+async def get_presence_index_stats():
+    """Hit/miss counters of the in-memory "present today" index (admin only)."""
+    return presence_index.stats()
+
+
+@router.get("/class-attendance", response_model=List[StudentAttendanceStatus])
+def get_class_attendance(
     date: str = Query(..., description="Date (YYYY-MM-DD)"),
     class_name: str = Query(..., description="Class name"),
     db: Session = Depends(get_db),
@@ -288,50 +639,31 @@ async def get_class_attendance(
 ):
     """Get all students in a class with their attendance status for a specific date."""
     
-    try:
-        date_obj = datetime.strptime(date, "%Y-%m-%d")
-        date_start = date_obj.replace(hour=0, minute=0, second=0, microsecond=0)
-        date_end = date_start + timedelta(days=1)
-    except ValueError:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid date format. Use YYYY-MM-DD"
-        )
-    
-    students = db.query(Student).filter(Student.class_name == class_name).order_by(Student.name).all()
-    
-    if not students:
-        return []
-    
-    attendance_records = db.query(Attendance).filter(
+    day = _parse_day(date, "date")
+    
+    # One outer join, projecting only the response columns (no QR token)
+    return db.query(
+        Student.id.label('student_id'),
+        Student.nis,
+        Student.name,
+        Student.class_name,
+        Student.photo_path,
+        Attendance.status,
+        Attendance.scanned_at
+    ).outerjoin(
+        Attendance,
         and_(
-            Attendance.student_id.in_([s.id for s in students]),
-            Attendance.scanned_at >= date_start,
-            Attendance.scanned_at < date_end,
+            Attendance.student_id == Student.id,
+            Attendance.attendance_date == day,
             Attendance.is_undone == False
         )
-    ).all()
-    
-    attendance_map = {att.student_id: att for att in attendance_records}
-    
-    result = []
-    for student in students:
-        attendance = attendance_map.get(student.id)
-        result.append(StudentAttendanceStatus(
-            student_id=student.id,
-            nis=student.nis,
-            name=student.name,
-            class_name=student.class_name,
-            photo_path=student.photo_path,
-            status=attendance.status if attendance else None,
-            scanned_at=attendance.scanned_at if attendance else None
-        ))
-    
-    return result
+    ).filter(
+        Student.class_name == class_name
+    ).order_by(Student.name).all()
 
 
 @router.post("/batch-update")
-async def batch_update_attendance(
+def batch_update_attendance(
     batch_data: BatchAttendanceUpdate,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -343,58 +675,50 @@ async def batch_update_attendance(
     logger.info(f"Received batch update request: {batch_data}")
     
     try:
-        date_obj = datetime.strptime(batch_data.date, "%Y-%m-%d")
-        date_start = date_obj.replace(hour=0, minute=0, second=0, microsecond=0)
-        date_end = date_start + timedelta(days=1)
+        day = datetime.strptime(batch_data.date, "%Y-%m-%d").date()
     except ValueError:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid date format. Use YYYY-MM-DD"
         )
     
-    updated_count = 0
-    created_count = 0
+    record_ids = {record.student_id for record in batch_data.records}
+    known_ids = {
+        row.id for row in db.query(Student.id).filter(Student.id.in_(record_ids)).all()
+    } if record_ids else set()
     
+    # Records without a scan time are stamped with the current time of day on `day`
+    default_time = WIB.localize(datetime.combine(day, get_wib_now().time()))
+    records = []
     for record in batch_data.records:
-        student = db.query(Student).filter(Student.id == record.student_id).first()
-        if not student:
+        if record.student_id not in known_ids:
             continue
         
-        existing_attendance = db.query(Attendance).filter(
-            and_(
-                Attendance.student_id == record.student_id,
-                Attendance.scanned_at >= date_start,
-                Attendance.scanned_at < date_end,
-                Attendance.is_undone == False
-            )
-        ).first()
-        
+        scan_time = default_time
         if record.scan_time:
             try:
                 scan_time = datetime.fromisoformat(record.scan_time.replace('Z', '+00:00'))
-            except:
-                scan_time = datetime.utcnow()
-        else:
-            scan_time = datetime.utcnow()
+                if scan_time.tzinfo is not None:
+                    scan_time = to_wib(scan_time)
+            except ValueError:
+                pass
+            if wib_date(scan_time) != day:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"scan_time {record.scan_time} of student {record.student_id} is not on {batch_data.date} (WIB)"
+                )
         
-        if existing_attendance:
-            # Update existing
-            existing_attendance.status = record.status
-            existing_attendance.scanned_at = scan_time
-            updated_count += 1
-        else:
-            # Create new
-            new_attendance = Attendance(
-                student_id=record.student_id,
-                scanned_at=scan_time,
-                status=record.status,
-                is_undone=False
-            )
-            db.add(new_attendance)
-            created_count += 1
+        records.append((record.student_id, day, scan_time, record.status))
     
+    written = upsert_attendance(db, records)
     db.commit()
     
+    for (student_id, _), (attendance_id, _) in written.items():
+        presence_index.mark_present(student_id, attendance_id, day)
+    
+    created_count = sum(1 for _, created in written.values() if created)
+    updated_count = len(written) - created_count
+    
     return {
         "message": "Batch update completed",
         "updated": updated_count,
@@ -1,25 +1,44 @@
 """
 Class Schedule routes for managing class information and schedules.
 """
-from typing import List
+from typing import List, Dict
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 from datetime import time
 from ..database import get_db
 from ..schemas import ClassScheduleResponse, ClassScheduleUpdate
-from ..models import ClassSchedule, User
-from ..auth import get_current_user
+from ..models import ClassSchedule, ClassWeekdayThreshold, User
+from ..auth import get_current_user, auth_cache
+from ..schedule_cache import schedule_cache
 
 router = APIRouter(prefix="/api/class-schedules", tags=["Class Schedules"])
 
 
+def _parse_time(value: str) -> time:
+    """Parse HH:MM or raise 400."""
+    try:
+        hours, minutes = value.split(':')
+        return time(int(hours), int(minutes))
+    except (ValueError, AttributeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid time format. Use HH:MM"
+        )
+
+
+def _weekday_thresholds(schedule: ClassSchedule) -> Dict[int, str]:
+    return {row.weekday: row.late_threshold_time.strftime('%H:%M') for row in schedule.weekday_thresholds}
+
+
 @router.get("", response_model=List[ClassScheduleResponse])
-async def get_class_schedules(
+def get_class_schedules(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get all class schedules."""
-    schedules = db.query(ClassSchedule).order_by(ClassSchedule.class_name).all()
+    schedules = db.query(ClassSchedule).options(
+        selectinload(ClassSchedule.weekday_thresholds)
+    ).order_by(ClassSchedule.class_name).all()
     
     result = []
     for schedule in schedules:
@@ -29,14 +48,15 @@ async def get_class_schedules(
             id=schedule.id,
             class_name=schedule.class_name,
             late_threshold_time=late_time_str,
-            is_active=schedule.is_active
+            is_active=schedule.is_active,
+            weekday_thresholds=_weekday_thresholds(schedule)
         ))
     
     return result
 
 
 @router.post("", response_model=ClassScheduleResponse)
-async def create_class_schedule(
+def create_class_schedule(
     class_name: str,
     late_threshold_time: str = "07:30",
     db: Session = Depends(get_db),
@@ -50,14 +70,7 @@ async def create_class_schedule(
             detail="Class already exists"
         )
     
-    try:
-        hours, minutes = late_threshold_time.split(':')
-        threshold_time = time(int(hours), int(minutes))
-    except:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid time format. Use HH:MM"
-        )
+    threshold_time = _parse_time(late_threshold_time)
     
     schedule = ClassSchedule(
         class_name=class_name,
@@ -68,6 +81,7 @@ async def create_class_schedule(
     db.add(schedule)
     db.commit()
     db.refresh(schedule)
+    schedule_cache.reload(db)
     
     return ClassScheduleResponse(
         id=schedule.id,
@@ -78,7 +92,7 @@ async def create_class_schedule(
 
 
 @router.put("/{schedule_id}", response_model=ClassScheduleResponse)
-async def update_class_schedule(
+def update_class_schedule(
     schedule_id: int,
     update_data: ClassScheduleUpdate,
     db: Session = Depends(get_db),
@@ -94,31 +108,40 @@ async def update_class_schedule(
         )
     
     # Update late threshold time
-    try:
-        hours, minutes = update_data.late_threshold_time.split(':')
-        schedule.late_threshold_time = time(int(hours), int(minutes))
-    except:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid time format. Use HH:MM"
-        )
+    schedule.late_threshold_time = _parse_time(update_data.late_threshold_time)
     
     if update_data.is_active is not None:
         schedule.is_active = update_data.is_active
     
+    # Replace the per-weekday overrides
+    if update_data.weekday_thresholds is not None:
+        overrides = []
+        for weekday, value in sorted(update_data.weekday_thresholds.items()):
+            if not 0 <= weekday <= 6:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Weekday must be between 0 (Monday) and 6 (Sunday)"
+                )
+            overrides.append(ClassWeekdayThreshold(weekday=weekday, late_threshold_time=_parse_time(value)))
+        schedule.weekday_thresholds = []
+        db.flush()
+        schedule.weekday_thresholds = overrides
+    
     db.commit()
     db.refresh(schedule)
+    schedule_cache.reload(db)
     
     return ClassScheduleResponse(
         id=schedule.id,
         class_name=schedule.class_name,
         late_threshold_time=update_data.late_threshold_time,
-        is_active=schedule.is_active
+        is_active=schedule.is_active,
+        weekday_thresholds=_weekday_thresholds(schedule)
     )
 
 
 @router.delete("/{schedule_id}")
-async def delete_class_schedule(
+def delete_class_schedule(
     schedule_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -134,12 +157,14 @@ async def delete_class_schedule(
     
     db.delete(schedule)
     db.commit()
+    schedule_cache.reload(db)
+    auth_cache.clear()  # Cached teacher classes may include the deleted class
     
     return {"message": "Class schedule deleted successfully"}
 
 
 @router.get("/{class_name}", response_model=ClassScheduleResponse)
-async def get_class_schedule_by_name(
+def get_class_schedule_by_name(
     class_name: str,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -162,5 +187,6 @@ async def get_class_schedule_by_name(
         id=schedule.id,
         class_name=schedule.class_name,
         late_threshold_time=late_time_str,
-        is_active=schedule.is_active
+        is_active=schedule.is_active,
+        weekday_thresholds=_weekday_thresholds(schedule)
     )
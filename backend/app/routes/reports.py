@@ -2,48 +2,52 @@
 Reports API routes for semester reports and analytics.
 """
 from fastapi import APIRouter, Depends, Query, HTTPException, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import extract, func, case
-from typing import List, Optional
-from ..database import get_db
-from ..schemas import SemesterReportItem, ClassListResponse
-from ..models import Student, Attendance
-from ..auth import get_current_user, User, get_teacher_classes
+from sqlalchemy import func, case, and_
+from datetime import date, datetime
+from typing import Iterable, List, Optional, Tuple
+from ..database import get_db, SessionLocal
+from ..schemas import SemesterReportItem, ClassListResponse, ClassMatrixResponse
+from ..models import Student, Attendance, StudentPeriodSummary
+from ..auth import get_current_user, User, get_teacher_classes, require_admin
+from ..summaries import rebuild_job
+from ..class_matrix import ClassMatrix
+from ..downloads import content_disposition
+from ..report_export import (
+    attendance_percentage, csv_chunks, xlsx_chunks, export_filename,
+    matrix_csv_chunks, matrix_xlsx_chunks, matrix_filename
+)
 
 router = APIRouter(prefix="/api/reports", tags=["Reports"])
 
+# Rows fetched per round trip while streaming an export
+EXPORT_BATCH_SIZE = 1000
 
-@router.get("/semester", response_model=List[SemesterReportItem])
-async def get_semester_report(
-    semester: int = Query(..., ge=1, le=2, description="Semester (1 or 2)"),
-    year: int = Query(..., description="Year"),
-    class_name: Optional[str] = Query(None, description="Filter by class"),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
+
+def semester_range(semester: int, year: int) -> Tuple[datetime, datetime]:
     """
-    Get semester attendance report aggregated by student with status breakdown.
-    
-    Semester 1 (Ganjil): July - December (months 7-12)
-    Semester 2 (Genap): January - June (months 1-6)
-    
-    Teachers can only access reports for assigned classes.
+    Half-open [start, end) scan time range of a semester.
+    Semester 1 (Ganjil): July - December; Semester 2 (Genap): January - June.
     """
-    
-    allowed_classes = get_teacher_classes(current_user, db)
-    
-    if allowed_classes is not None:  # Teacher
-        if class_name:
-            if class_name not in allowed_classes:
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail=f"Access denied to class {class_name}"
-                )
-    
     if semester == 1:
-        start_month, end_month = 7, 12
-    else:
-        start_month, end_month = 1, 6
+        return datetime(year, 7, 1), datetime(year + 1, 1, 1)
+    return datetime(year, 1, 1), datetime(year, 7, 1)
+
+
+def build_semester_report_query(db: Session, semester: int, year: int, classes: Optional[Iterable[str]] = None):
+    """
+    Per-student status counts for a semester aggregated live from attendance,
+    one row per student. The endpoint reads the equivalent rollup
+    (build_semester_rollup_query); this query is the reference it must match.
+    
+    The scan time range and the undone filter are part of the outer join
+    condition, so students without attendance are kept (with zero counts)
+    and each student's records are read through the
+    (student_id, scanned_at) index instead of scanning the whole table.
+    `classes` limits the students; None means all classes.
+    """
+    start, end = semester_range(semester, year)
     
     query = db.query(
         Student.nis.label('student_id'),
@@ -56,29 +60,148 @@ async def get_semester_report(
         func.sum(case((Attendance.status == 'Absent', 1), else_=0)).label('total_absent'),
         func.count(Attendance.id).label('total_days')
     ).outerjoin(
-        Attendance, Student.id == Attendance.student_id
-    ).filter(
-        extract('year', Attendance.scanned_at) == year,
-        extract('month', Attendance.scanned_at) >= start_month,
-        extract('month', Attendance.scanned_at) <= end_month,
-        Attendance.is_undone == False  # Only count non-undone attendance
+        Attendance,
+        and_(
+            Attendance.student_id == Student.id,
+            Attendance.scanned_at >= start,
+            Attendance.scanned_at < end,
+            Attendance.is_undone == False  # Only count non-undone attendance
+        )
     )
     
-    if allowed_classes is not None:  # Teacher
-        if class_name:
-            query = query.filter(Student.class_name == class_name)
-        else:
-            query = query.filter(Student.class_name.in_(allowed_classes))
-    elif class_name:  # Admin 
-        query = query.filter(Student.class_name == class_name)
+    if classes is not None:
+        query = query.filter(Student.class_name.in_(list(classes)))
     
-    query = query.group_by(
+    return query.group_by(
         Student.id, Student.nis, Student.name, Student.class_name
     ).order_by(
         Student.class_name, Student.name
     )
+
+
+def build_semester_rollup_query(db: Session, semester: int, year: int, classes: Optional[Iterable[str]] = None):
+    """
+    Same rows as build_semester_report_query, read from student_period_summary:
+    at most five counter rows per student, however much history is kept.
+    """
+    def total(status_name: str):
+        return func.sum(case((StudentPeriodSummary.status == status_name, StudentPeriodSummary.count), else_=0))
+    
+    query = db.query(
+        Student.nis.label('student_id'),
+        Student.name.label('student_name'),
+        Student.class_name,
+        total('Present').label('total_present'),
+        total('Late').label('total_late'),
+        total('Sick').label('total_sick'),
+        total('Permission').label('total_permission'),
+        total('Absent').label('total_absent'),
+        func.coalesce(func.sum(StudentPeriodSummary.count), 0).label('total_days')
+    ).outerjoin(
+        StudentPeriodSummary,
+        and_(
+            StudentPeriodSummary.student_id == Student.id,
+            StudentPeriodSummary.year == year,
+            StudentPeriodSummary.semester == semester
+        )
+    )
+    
+    if classes is not None:
+        query = query.filter(Student.class_name.in_(list(classes)))
+    
+    return query.group_by(
+        Student.id, Student.nis, Student.name, Student.class_name
+    ).order_by(
+        Student.class_name, Student.name
+    )
+
+
+def month_range(month: date) -> Tuple[datetime, datetime]:
+    """Half-open [start, end) scan time range of the month containing `month`."""
+    start = datetime(month.year, month.month, 1)
+    if month.month == 12:
+        return start, datetime(month.year + 1, 1, 1)
+    return start, datetime(month.year, month.month + 1, 1)
+
+
+def build_class_matrix_query(db: Session, class_name: str, month: date):
+    """
+    (id, nis, name, attendance_date, status) of every student of a class and
+    their active attendance in `month`, ordered by student. Students without
+    attendance come back once with a NULL date.
+    """
+    start, end = month_range(month)
+    
+    return db.query(
+        Student.id,
+        Student.nis,
+        Student.name,
+        Attendance.attendance_date,
+        Attendance.status
+    ).outerjoin(
+        Attendance,
+        and_(
+            Attendance.student_id == Student.id,
+            Attendance.scanned_at >= start,
+            Attendance.scanned_at < end,
+            Attendance.is_undone == False
+        )
+    ).filter(
+        Student.class_name == class_name
+    ).order_by(
+        Student.name, Student.id
+    )
+
+
+def parse_month(month: str) -> date:
+    try:
+        return datetime.strptime(month, "%Y-%m").date()
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid month format. Use YYYY-MM"
+        )
+
+
+def report_classes(db: Session, current_user: User, class_name: Optional[str]) -> Optional[Iterable[str]]:
+    """
+    Classes a report for `class_name` covers: the class itself, a teacher's
+    assigned classes when no class is given, or None (all) for admins.
+    Teachers asking for another class get 403.
+    """
+    allowed_classes = get_teacher_classes(current_user, db)
+    
+    if allowed_classes is not None:  # Teacher
+        if class_name:
+            if class_name not in allowed_classes:
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail=f"Access denied to class {class_name}"
+                )
+            return [class_name]
+        return allowed_classes
+    
+    return [class_name] if class_name else None
+
+
+@router.get("/semester", response_model=List[SemesterReportItem])
+def get_semester_report(
+    semester: int = Query(..., ge=1, le=2, description="Semester (1 or 2)"),
+    year: int = Query(..., description="Year"),
+    class_name: Optional[str] = Query(None, description="Filter by class"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get semester attendance report aggregated by student with status breakdown.
     
-    results = query.all()
+    Semester 1 (Ganjil): July - December (months 7-12)
+    Semester 2 (Genap): January - June (months 1-6)
+    
+    Teachers can only access reports for assigned classes.
+    """
+    classes = report_classes(db, current_user, class_name)
+    results = build_semester_rollup_query(db, semester, year, classes).all()
     
     report = []
     for row in results:
@@ -88,12 +211,6 @@ async def get_semester_report(
         total_permission = row.total_permission or 0
         total_absent = row.total_absent or 0
         
-        total_records = total_present + total_late + total_sick + total_permission + total_absent
-        
-        total_attended = total_present + total_late
-        
-        attendance_percentage = (total_attended / total_records * 100) if total_records > 0 else 0.0
-        
         report.append(SemesterReportItem(
             student_id=row.student_id,
             student_name=row.student_name,
@@ -103,14 +220,132 @@ async def get_semester_report(
             total_sick=total_sick,
             total_permission=total_permission,
             total_absent=total_absent,
-            attendance_percentage=round(attendance_percentage, 2)
+            attendance_percentage=attendance_percentage(
+                total_present, total_late, total_sick, total_permission, total_absent
+            )
         ))
     
     return report
 
 
+@router.get("/semester/export")
+def export_semester_report(
+    semester: int = Query(..., ge=1, le=2, description="Semester (1 or 2)"),
+    year: int = Query(..., description="Year"),
+    class_name: Optional[str] = Query(None, description="Filter by class"),
+    format: str = Query("xlsx", pattern="^(xlsx|csv)$", description="xlsx or csv"),
+    per_class: bool = Query(False, description="XLSX: one sheet per class"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Download the semester report as XLSX or CSV.
+    
+    Rows are streamed from the database in batches and written as they
+    arrive, so the export does not hold the whole report in memory.
+    Same access rules as /semester.
+    """
+    classes = report_classes(db, current_user, class_name)
+    if classes is not None:
+        classes = list(classes)
+    
+    def rows():
+        # The request session is closed once the response starts; the stream
+        # reads through its own session
+        stream_db = SessionLocal()
+        try:
+            query = build_semester_rollup_query(stream_db, semester, year, classes)
+            yield from query.yield_per(EXPORT_BATCH_SIZE)
+        finally:
+            stream_db.close()
+    
+    if format == "csv":
+        content, media_type = csv_chunks(rows()), "text/csv; charset=utf-8"
+    else:
+        content = xlsx_chunks(rows(), semester, year, class_name, per_class)
+        media_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    
+    filename = export_filename(semester, year, class_name, format)
+    return StreamingResponse(
+        content,
+        media_type=media_type,
+        headers={
+            "Content-Disposition": content_disposition(filename)
+        }
+    )
+
+
+@router.get("/class-matrix", response_model=ClassMatrixResponse)
+def get_class_matrix(
+    class_name: str = Query(..., description="Class name"),
+    month: str = Query(..., description="Month (YYYY-MM)"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Monthly attendance grid of a class: students x days with attendance.
+    
+    Each entry of `rows` is one student's cells as a string of digits, one
+    per day in `days`: 0 = no record, n = statuses[n - 1].
+    Teachers can only access their assigned classes.
+    """
+    report_classes(db, current_user, class_name)
+    month_start = parse_month(month)
+    
+    rows = build_class_matrix_query(db, class_name, month_start).all()
+    return ClassMatrix.from_rows(class_name, month_start, rows).to_dict()
+
+
+@router.get("/class-matrix/export")
+def export_class_matrix(
+    class_name: str = Query(..., description="Class name"),
+    month: str = Query(..., description="Month (YYYY-MM)"),
+    format: str = Query("xlsx", pattern="^(xlsx|csv)$", description="xlsx or csv"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Download the monthly class grid as XLSX or CSV (status letters per day)."""
+    report_classes(db, current_user, class_name)
+    month_start = parse_month(month)
+    
+    rows = build_class_matrix_query(db, class_name, month_start).all()
+    matrix = ClassMatrix.from_rows(class_name, month_start, rows)
+    
+    if format == "csv":
+        content, media_type = matrix_csv_chunks(matrix), "text/csv; charset=utf-8"
+    else:
+        content = matrix_xlsx_chunks(matrix)
+        media_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    
+    filename = matrix_filename(class_name, month_start, format)
+    return StreamingResponse(
+        content,
+        media_type=media_type,
+        headers={
+            "Content-Disposition": content_disposition(filename)
+        }
+    )
+
+
+@router.post("/rollups/rebuild", status_code=status.HTTP_202_ACCEPTED, dependencies=[Depends(require_admin)])
+async def rebuild_report_rollups():
+    """Recompute the attendance rollups in a background thread (admin only)."""
+    if not rebuild_job.start():
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A rebuild is already running"
+        )
+    return {"message": "Rebuild started"}
+
+
+@router.get("/rollups/rebuild", dependencies=[Depends(require_admin)])
+async def get_rollup_rebuild_status():
+    """State of the last rollup rebuild (admin only)."""
+    return rebuild_job.status()
+
+
 @router.get("/classes", response_model=ClassListResponse)
-async def get_classes_list(
+def get_classes_list(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -2,38 +2,214 @@
 import os
 import io
 import csv
+import shutil
 from datetime import datetime
-from typing import List, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile
-from fastapi.responses import FileResponse, StreamingResponse
+from typing import List, Dict, Any, Optional, Union
+from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from sqlalchemy import and_, func, or_, tuple_
 from sqlalchemy.orm import Session
 from pathlib import Path
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from ..database import get_db
-from ..schemas import StudentCreate, StudentUpdate, StudentResponse, ImportSummary, ImportResultRow
+from ..schemas import StudentCreate, StudentUpdate, StudentResponse, ImportSummary, RosterSyncSummary
 from ..models import Student, User
-from ..auth import get_current_user, require_admin
-from ..barcode import generate_token, save_qr_image
+from ..auth import get_current_user, get_teacher_classes, require_admin
+from ..barcode import generate_token, invalidate_student_tokens
 from ..config import get_settings
+from ..summaries import count_student, remove_student
+from ..qr_bulk import BulkQrResponse, QrJob, bulk_progress, iter_qr_zip
+from ..qr_store import qr_key, get_qr_png, remove_qr_png
+from ..id_cards import iter_cards_pdf
+from ..pagination import MAX_PAGE_SIZE, encode_cursor, decode_cursor
+from ..downloads import content_disposition
+from ..student_import import IMPORT_EXTENSIONS, RosterSyncError, import_rows, iter_upload_rows, sync_roster
 
 settings = get_settings()
 router = APIRouter(prefix="/api/students", tags=["Students"])
 
+# Columns read for StudentResponse lists (everything but the QR nonce)
+STUDENT_RESPONSE_COLUMNS = [
+    Student.id,
+    Student.nis,
+    Student.name,
+    Student.class_name,
+    Student.barcode_token,
+    Student.barcode_generated_at,
+    Student.photo_path,
+    Student.created_at,
+]
+
+
+# Sort orders of the student list: the keyset columns, ending in a unique one
+STUDENT_SORTS = {
+    "id": [Student.id],
+    "name": [Student.name, Student.id],
+    "nis": [Student.nis],
+    "class_name": [Student.class_name, Student.name, Student.id],
+}
+
+
+def _prefix_range(column, prefix):
+    """`column` starts with `prefix`, as a range an index on `column` can serve."""
+    return and_(column >= prefix, column < prefix + "\U0010ffff")
+
+
+def _remove_student_files(barcode_token: Optional[str], photo_path: Optional[str]) -> None:
+    """Delete the stored QR image and photo of a student being removed."""
+    if barcode_token:
+        remove_qr_png(barcode_token)
+    
+    if photo_path:
+        photo_filepath = os.path.join(settings.STORAGE_PATH, photo_path)
+        if os.path.exists(photo_filepath):
+            os.remove(photo_filepath)
+
 
 @router.get("", response_model=List[StudentResponse])
-async def get_students(
-    skip: int = 0,
-    limit: int = 100,
+def get_students(
+    response: Response,
+    class_name: Optional[str] = Query(None, description="Filter by class"),
+    q: Optional[str] = Query(None, min_length=1, description="Name or NIS prefix (case-insensitive; only for ASCII letters on SQLite)"),
+    sort: str = Query("id", pattern="^-?(id|name|nis|class_name)$", description="id, name, nis or class_name; prefix with - for descending"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return (id is always included)"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    include_total: bool = Query(False, description="Send the number of matching students in X-Total-Count"),
+    skip: int = Query(0, ge=0, description="Offset paging (deprecated, use cursor)"),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-
-    students = db.query(Student).offset(skip).limit(limit).all()
+    """
+    List students, limited to a teacher's classes.
+    
+    Pages are keyed on the sort columns (plus id): when more students
+    follow, the X-Next-Cursor header holds the cursor for the next page.
+    With `fields` only those fields are returned, e.g. `fields=nis,name`
+    to leave out the QR token.
+    """
+    
+    classes = get_teacher_classes(current_user, db)
+    if class_name:
+        if classes is not None and class_name not in classes:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"Access denied to class {class_name}"
+            )
+        classes = [class_name]
+    
+    columns = STUDENT_RESPONSE_COLUMNS
+    if fields:
+        names = {"id"} | {name.strip() for name in fields.split(",") if name.strip()}
+        unknown = names - {column.key for column in STUDENT_RESPONSE_COLUMNS}
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown fields: {', '.join(sorted(unknown))}"
+            )
+        columns = [column for column in STUDENT_RESPONSE_COLUMNS if column.key in names]
+    keys = [column.key for column in columns]
+    
+    descending = sort.startswith("-")
+    sort_columns = STUDENT_SORTS[sort.lstrip("-")]
+    query = db.query(*columns, *[column for column in sort_columns if column.key not in keys])
+    
+    if classes is not None:
+        query = query.filter(Student.class_name.in_(list(classes)))
+    if q:
+        # The database folds q itself, so it matches lower(name) exactly (SQLite's only folds ASCII)
+        query = query.filter(or_(
+            _prefix_range(func.lower(Student.name), func.lower(q)),
+            _prefix_range(Student.nis, q)
+        ))
+    
+    headers = {}
+    if include_total:
+        headers["X-Total-Count"] = str(query.with_entities(func.count(Student.id)).scalar())
+    
+    if cursor:
+        key = decode_cursor(cursor, len(sort_columns))
+        if any(not isinstance(value, int if column is Student.id else str) for column, value in zip(sort_columns, key)):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+        sort_key = tuple_(*sort_columns)
+        query = query.filter(sort_key < tuple(key) if descending else sort_key > tuple(key))
+    
+    query = query.order_by(*[column.desc() if descending else column for column in sort_columns])
+    if skip and not cursor:
+        query = query.offset(skip)
+    
+    # One extra row tells whether another page follows
+    students = query.limit(limit + 1).all()
+    if len(students) > limit:
+        students = students[:limit]
+        headers["X-Next-Cursor"] = encode_cursor(*(getattr(students[-1], column.key) for column in sort_columns))
+    
+    if fields:
+        # Partial rows do not fit StudentResponse; send them as they are
+        return JSONResponse(
+            content=jsonable_encoder([{key: getattr(student, key) for key in keys} for student in students]),
+            headers=headers
+        )
+    
+    response.headers.update(headers)
+    # Columns of StudentResponse only; rows are validated in one pass
     return students
 
 
+@router.get("/cards.pdf")
+def get_student_cards(
+    class_name: Optional[str] = Query(None, description="Only this class; all accessible classes when omitted"),
+    columns: int = Query(2, ge=1, le=4, description="Cards per row"),
+    rows: int = Query(5, ge=1, le=6, description="Card rows per page"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Printable ID cards (photo, QR code, name, NIS and class) on A4 pages,
+    `columns` x `rows` cards per page, ordered by class and name.
+    
+    Students without a generated QR code are left out; their number is in
+    the X-Skipped-Count header. Pages are rendered on the QR process pool
+    and streamed as they complete.
+    """
+    classes = get_teacher_classes(current_user, db)
+    if class_name:
+        if classes is not None and class_name not in classes:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"Access denied to class {class_name}"
+            )
+        classes = [class_name]
+    
+    query = db.query(Student.nis, Student.name, Student.class_name, Student.barcode_token, Student.photo_path)
+    if classes is not None:
+        query = query.filter(Student.class_name.in_(list(classes)))
+    students = query.order_by(Student.class_name, Student.name).all()
+    
+    cards = [student for student in students if student.barcode_token]
+    if not cards:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No students with a generated QR code found"
+        )
+    
+    label = (class_name or "Semua-Kelas").replace("/", "-").replace("\\", "-")
+    return StreamingResponse(
+        iter_cards_pdf(cards, columns, rows),
+        media_type="application/pdf",
+        headers={
+            "Content-Disposition": content_disposition(f"Kartu_{label}.pdf", inline=True),
+            "X-Skipped-Count": str(len(students) - len(cards))
+        }
+    )
+
+
 @router.get("/{student_id}", response_model=StudentResponse)
-async def get_student(
+def get_student(
     student_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -51,7 +227,7 @@ async def get_student(
 
 
 @router.post("", response_model=StudentResponse, status_code=status.HTTP_201_CREATED)
-async def create_student(
+def create_student(
     student_data: StudentCreate,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -77,7 +253,7 @@ async def create_student(
 
 
 @router.put("/{student_id}", response_model=StudentResponse)
-async def update_student(
+def update_student(
     student_id: int,
     student_data: StudentUpdate,
     db: Session = Depends(get_db),
@@ -93,11 +269,20 @@ async def update_student(
         )
     
     update_data = student_data.model_dump(exclude_unset=True)
+    class_changed = update_data.get("class_name", student.class_name) != student.class_name
     
     try:
+        # Daily counters are per class: move the student's attendance along
+        if class_changed:
+            count_student(db, student.id, sign=-1)
+        
         for field, value in update_data.items():
             setattr(student, field, value)
         
+        if class_changed:
+            db.flush()
+            count_student(db, student.id)
+        
         db.commit()
         db.refresh(student)
         return student
@@ -110,7 +295,7 @@ async def update_student(
 
 
 @router.delete("/{student_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_student(
+def delete_student(
     student_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -124,25 +309,18 @@ async def delete_student(
             detail="Student not found"
         )
     
-    if student.barcode_token:
-        qr_filename = f"student_{student.id}.png"
-        qr_filepath = os.path.join(settings.STORAGE_PATH, "barcodes", qr_filename)
-        if os.path.exists(qr_filepath):
-            os.remove(qr_filepath)
-    
-    if student.photo_path:
-        photo_filepath = os.path.join(settings.STORAGE_PATH, student.photo_path)
-        if os.path.exists(photo_filepath):
-            os.remove(photo_filepath)
+    _remove_student_files(student.barcode_token, student.photo_path)
     
+    remove_student(db, student.id)
     db.delete(student)
     db.commit()
+    invalidate_student_tokens(str(student_id))
     
     return None
 
 
 @router.post("/{student_id}/generate-qr")
-async def generate_student_qr(
+def generate_student_qr(
     student_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -167,13 +345,9 @@ async def generate_student_qr(
     student.barcode_token = token
     student.barcode_nonce = nonce
     student.barcode_generated_at = datetime.utcnow()
+    invalidate_student_tokens(str(student.id))
     
-    qr_filename = f"student_{student.id}.png"
-    barcodes_dir = os.path.join(settings.STORAGE_PATH, "barcodes")
-    os.makedirs(barcodes_dir, exist_ok=True)
-    qr_filepath = os.path.join(barcodes_dir, qr_filename)
-    
-    save_qr_image(token, qr_filepath, size=400)
+    get_qr_png(token)
     
     db.commit()
     db.refresh(student)
@@ -186,13 +360,93 @@ async def generate_student_qr(
     }
 
 
+@router.post("/generate-qr-bulk", dependencies=[Depends(require_admin)])
+def generate_qr_bulk(
+    class_name: Optional[str] = Query(None, description="Only this class; all classes when omitted"),
+    regenerate: bool = Query(False, description="Also replace existing QR codes (old cards stop working)"),
+    db: Session = Depends(get_db)
+):
+    """
+    Generate QR codes for a class or the whole school and download them as a ZIP.
+    
+    Missing tokens (all tokens with regenerate=true) are created in one
+    transaction. The images are rendered on a process pool, saved to
+    storage/barcodes and streamed back in a ZIP (one folder per class)
+    as they complete. Progress: GET /api/students/generate-qr-bulk/status.
+    """
+    # Claim the run first: a second run must not replace tokens this one is printing
+    if not bulk_progress.begin():
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A bulk QR generation is already running"
+        )
+    
+    try:
+        query = db.query(Student)
+        if class_name:
+            query = query.filter(Student.class_name == class_name)
+        students = query.order_by(Student.class_name, Student.name).all()
+        
+        if not students:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="No students found"
+            )
+        
+        now = datetime.utcnow()
+        generated, regenerated = 0, []
+        for student in students:
+            if regenerate or not student.barcode_token:
+                if student.barcode_token:
+                    regenerated.append((student.id, student.barcode_token))
+                student.barcode_token, student.barcode_nonce = generate_token(str(student.id))
+                student.barcode_generated_at = now
+                generated += 1
+        db.commit()
+        
+        for student_id, old_token in regenerated:
+            invalidate_student_tokens(str(student_id))
+            remove_qr_png(old_token)
+        
+        jobs = [
+            QrJob(student.id, student.nis, student.name, student.class_name, student.barcode_token)
+            for student in students
+        ]
+        bulk_progress.set_total(len(jobs))
+    except BaseException as e:
+        db.rollback()
+        bulk_progress.finish(e.detail if isinstance(e, HTTPException) else (str(e) or type(e).__name__))
+        raise
+    
+    label = (class_name or "Semua-Kelas").replace("/", "-").replace("\\", "-")
+    # Releases the run when the response ends, however it ends
+    return BulkQrResponse(
+        iter_qr_zip(jobs),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": content_disposition(f"QR_{label}.zip"),
+            "X-Generated-Count": str(generated)
+        }
+    )
+
+
+@router.get("/generate-qr-bulk/status", dependencies=[Depends(require_admin)])
+def get_qr_bulk_status():
+    """Progress of the current (or last) bulk QR generation."""
+    return bulk_progress.status()
+
+
 @router.get("/{student_id}/download-qr")
-async def download_student_qr(
+def download_student_qr(
     student_id: int,
+    request: Request,
     db: Session = Depends(get_db)
 ):
-
-    student = db.query(Student).filter(Student.id == student_id).first()
+    """
+    The student's QR image. The ETag is the hash of the token, so clients
+    revalidate with If-None-Match and get 304 until the QR is regenerated.
+    """
+    student = db.query(Student.nis, Student.name, Student.barcode_token).filter(Student.id == student_id).first()
     
     if not student:
         raise HTTPException(
@@ -206,22 +460,22 @@ async def download_student_qr(
             detail="QR code not generated yet. Please generate first."
         )
     
-    qr_filename = f"student_{student.id}.png"
-    qr_filepath = os.path.join(settings.STORAGE_PATH, "barcodes", qr_filename)
-    
-    
-    if not os.path.exists(qr_filepath):
-        save_qr_image(student.barcode_token, qr_filepath, size=400)
+    etag = f'"{qr_key(student.barcode_token)}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "no-cache",
+        "Content-Disposition": content_disposition(f"QR_{student.nis}_{student.name}.png")
+    }
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
     
-    return FileResponse(
-        path=qr_filepath,
-        media_type="image/png",
-        filename=f"QR_{student.nis}_{student.name}.png"
-    )
+    # Route runs in the threadpool, so a render on a miss stays off the event loop
+    _, png = get_qr_png(student.barcode_token)
+    return Response(content=png, media_type="image/png", headers=headers)
 
 
 @router.post("/{student_id}/upload-photo")
-async def upload_student_photo(
+def upload_student_photo(
     student_id: int,
     photo: UploadFile = File(...),
     db: Session = Depends(get_db),
@@ -257,8 +511,7 @@ async def upload_student_photo(
     photo_filepath = os.path.join(photos_dir, photo_filename)
     
     with open(photo_filepath, "wb") as buffer:
-        content = await photo.read()
-        buffer.write(content)
+        shutil.copyfileobj(photo.file, buffer)
     
     student.photo_path = f"photos/{photo_filename}"
     db.commit()
@@ -272,7 +525,7 @@ async def upload_student_photo(
 
 
 @router.get("/{student_id}/photo")
-async def get_student_photo(
+def get_student_photo(
     student_id: int,
     db: Session = Depends(get_db)
 ):
@@ -316,19 +569,36 @@ async def get_student_photo(
     )
 
 
-@router.post("/import", response_model=ImportSummary, dependencies=[Depends(require_admin)])
-async def import_students(
+@router.post("/import", response_model=Union[RosterSyncSummary, ImportSummary], dependencies=[Depends(require_admin)])
+def import_students(
     file: UploadFile = File(...),
+    mode: str = Query("insert", pattern="^(insert|upsert)$", description="insert: add new students only; upsert: sync the roster"),
+    dry_run: bool = Query(False, description="Only report what would change"),
+    remove_missing: bool = Query(False, description="upsert: delete students (and their attendance) not in the file"),
+    expected_removals: Optional[int] = Query(None, ge=0, description="upsert with remove_missing: the removed count of the dry run"),
     db: Session = Depends(get_db)
 ):
     """
-    Bulk import students from CSV file.
+    Bulk import students from a CSV or XLSX file.
     Admin only.
     
-    Expected format:
+    Expected format (first sheet for XLSX):
     NIS, Name, Class
     12345, Ahmad Fauzi, 1A
     12346, Siti Nurhaliza, 1A
+    
+    mode=insert (default): rows whose NIS already exists (or appears
+    earlier in the file) are reported as duplicates and skipped.
+    
+    mode=upsert: the file is the full roster. New NIS values are inserted,
+    name and class changes are applied to existing students (their
+    attendance is kept) and, with remove_missing=true, students missing
+    from the file are deleted. The response lists every change; with
+    dry_run=true nothing is saved, so it can be previewed first.
+    
+    remove_missing is refused (400) when any row is rejected or none is
+    valid, and a real run must repeat the dry run's `removed` count as
+    expected_removals, so a wrong file cannot wipe the roster.
     """
     
     if not file.filename:
@@ -338,106 +608,49 @@ async def import_students(
         )
     
     file_ext = Path(file.filename).suffix.lower()
-    if file_ext not in ['.csv']:
+    if file_ext not in IMPORT_EXTENSIONS:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid file format. Please upload CSV file"
+            detail="Invalid file format. Please upload CSV or XLSX file"
         )
     
-    content = await file.read()
-    
+    removed = []
     try:
-        data = parse_csv(content)
-    except Exception as e:
+        rows = iter_upload_rows(file.file, file_ext)
+        if mode == "upsert":
+            summary, removed = sync_roster(
+                db, rows, remove_missing=remove_missing, dry_run=dry_run, expected_removals=expected_removals
+            )
+        else:
+            summary = import_rows(db, rows)
+        if dry_run:
+            db.rollback()
+        else:
+            db.commit()
+    except RosterSyncError as e:
+        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Error parsing file: {str(e)}"
+            detail=str(e)
         )
-    
-    success_count = 0
-    error_count = 0
-    results: List[ImportResultRow] = []
-    
-    for row_num, row_data in enumerate(data, start=2):  # Start at 2 (header is row 1)
-        try:
-            nis = row_data.get('nis', '').strip()
-            name = row_data.get('name', '').strip()
-            class_name = row_data.get('class', '').strip()
-            
-            if not nis or not name or not class_name:
-                error_count += 1
-                results.append(ImportResultRow(
-                    row=row_num,
-                    nis=nis or "N/A",
-                    name=name or "N/A",
-                    class_name=class_name or "N/A",
-                    success=False,
-                    error="Missing required fields (NIS, Name, or Class)"
-                ))
-                continue
-            
-            # Check for duplicate NIS
-            existing = db.query(Student).filter(Student.nis == nis).first()
-            if existing:
-                error_count += 1
-                results.append(ImportResultRow(
-                    row=row_num,
-                    nis=nis,
-                    name=name,
-                    class_name=class_name,
-                    success=False,
-                    error=f"NIS {nis} already exists"
-                ))
-                continue
-            
-            # Create student
-            student = Student(
-                nis=nis,
-                name=name,
-                class_name=class_name
-            )
-            
-            db.add(student)
-            db.flush()  # Get the ID without committing
-            
-            success_count += 1
-            results.append(ImportResultRow(
-                row=row_num,
-                nis=nis,
-                name=name,
-                class_name=class_name,
-                success=True,
-                error=None
-            ))
-            
-        except Exception as e:
-            error_count += 1
-            results.append(ImportResultRow(
-                row=row_num,
-                nis=row_data.get('nis', 'N/A'),
-                name=row_data.get('name', 'N/A'),
-                class_name=row_data.get('class', 'N/A'),
-                success=False,
-                error=str(e)
-            ))
-    
-    # Commit all successful imports
-    try:
-        db.commit()
-    except Exception as e:
+    except SQLAlchemyError as e:
         db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error saving to database: {str(e)}"
         )
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Error parsing file: {str(e)}"
+        )
     
-    return ImportSummary(
-        total_rows=len(data),
-        success=success_count,
-        failed=error_count,
-        duplicates=0,  # We already counted duplicates in error_count
-        errors=results
-    )
+    for student in removed:
+        _remove_student_files(student.barcode_token, student.photo_path)
+        invalidate_student_tokens(str(student.id))
+    
+    return summary
 
 
 @router.get("/import/template")
@@ -463,25 +676,6 @@ async def download_import_template():
         iter([output.getvalue()]),
         media_type="text/csv",
         headers={
-            "Content-Disposition": "attachment; filename=template_import_siswa.csv"
+            "Content-Disposition": content_disposition("template_import_siswa.csv")
         }
     )
-
-
-def parse_csv(content: bytes) -> List[Dict[str, str]]:
-    """Parse CSV file content into list of dictionaries."""
-    
-    # Decode bytes to string
-    text = content.decode('utf-8-sig')  # utf-8-sig handles BOM
-    
-    # Parse CSV
-    reader = csv.DictReader(io.StringIO(text))
-    
-    # Convert to list of dicts
-    data = []
-    for row in reader:
-        # Normalize keys to lowercase and strip whitespace
-        normalized_row = {k.strip().lower(): v.strip() for k, v in row.items()}
-        data.append(normalized_row)
-    
-    return data
@@ -10,14 +10,14 @@ from ..schemas import (
     UserCreate, UserUpdate, UserResponse, UserWithClasses,
     AssignClassesRequest, TeacherClassAccessResponse
 )
-from ..auth import require_admin, hash_password, get_current_user
+from ..auth import require_admin, hash_password, get_current_user, auth_cache
 from sqlalchemy.exc import IntegrityError
 
 router = APIRouter(prefix="/api/users", tags=["User Management"])
 
 
 @router.post("/", response_model=UserResponse, dependencies=[Depends(require_admin)])
-async def create_user(
+def create_user(
     user_data: UserCreate,
     db: Session = Depends(get_db)
 ):
@@ -46,7 +46,7 @@ async def create_user(
 
 
 @router.get("/", response_model=List[UserWithClasses], dependencies=[Depends(require_admin)])
-async def list_users(db: Session = Depends(get_db)):
+def list_users(db: Session = Depends(get_db)):
     """List all users with their assigned classes (admin only)."""
     
     users = db.query(User).all()
@@ -74,7 +74,7 @@ async def list_users(db: Session = Depends(get_db)):
 
 
 @router.get("/{user_id}", response_model=UserWithClasses, dependencies=[Depends(require_admin)])
-async def get_user(user_id: int, db: Session = Depends(get_db)):
+def get_user(user_id: int, db: Session = Depends(get_db)):
     """Get single user by ID (admin only)."""
     
     user = db.query(User).filter(User.id == user_id).first()
@@ -99,7 +99,7 @@ async def get_user(user_id: int, db: Session = Depends(get_db)):
 
 
 @router.put("/{user_id}", response_model=UserResponse, dependencies=[Depends(require_admin)])
-async def update_user(
+def update_user(
     user_id: int,
     user_data: UserUpdate,
     db: Session = Depends(get_db)
@@ -133,13 +133,14 @@ async def update_user(
         user.role = user_data.role
     
     db.commit()
+    auth_cache.invalidate_user(user_id)
     db.refresh(user)
     
     return user
 
 
 @router.delete("/{user_id}", dependencies=[Depends(require_admin)])
-async def delete_user(
+def delete_user(
     user_id: int,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -159,12 +160,13 @@ async def delete_user(
     
     db.delete(user)  # Cascade will delete TeacherClassAccess entries
     db.commit()
+    auth_cache.invalidate_user(user_id)
     
     return {"message": "User deleted successfully"}
 
 
 @router.post("/{user_id}/classes", response_model=List[TeacherClassAccessResponse], dependencies=[Depends(require_admin)])
-async def assign_classes(
+def assign_classes(
     user_id: int,
     request: AssignClassesRequest,
     db: Session = Depends(get_db)
@@ -198,6 +200,7 @@ async def assign_classes(
     
     try:
         db.commit()
+        auth_cache.invalidate_user(user_id)
         for access in new_accesses:
             db.refresh(access)
     except IntegrityError:
@@ -211,7 +214,7 @@ async def assign_classes(
 
 
 @router.get("/{user_id}/classes", response_model=List[str], dependencies=[Depends(require_admin)])
-async def get_teacher_classes_list(user_id: int, db: Session = Depends(get_db)):
+def get_teacher_classes_list(user_id: int, db: Session = Depends(get_db)):
     """Get classes assigned to teacher (admin only)."""
     
     user = db.query(User).filter(User.id == user_id).first()
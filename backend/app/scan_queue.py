@@ -0,0 +1,155 @@
+"""
+Write-behind queue for attendance scans (group commit).
+
+During the morning rush every scan used to pay for its own commit. When
+SCAN_QUEUE_ENABLED is set, scans are collected in memory, de-duplicated per
+student per day, and written to the attendance table in one transaction
+every SCAN_QUEUE_FLUSH_INTERVAL_MS milliseconds or SCAN_QUEUE_BATCH_SIZE scans,
+whichever comes first.
+"""
+import logging
+import threading
+from concurrent.futures import Future
+from datetime import datetime, date
+from typing import Dict, Tuple
+from .attendance_store import insert_attendance
+from .config import get_settings
+from .database import SessionLocal
+from .timezone_utils import wib_date
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class ScanQueueStopped(RuntimeError):
+    """submit() was called while the queue is not running (e.g. during shutdown)."""
+
+
+class PendingScan:
+    """A scan waiting to be flushed. The future resolves to (attendance_id, already_scanned)."""
+
+    def __init__(self, student_id: int, scanned_at: datetime, status: str):
+        self.student_id = student_id
+        self.scanned_at = scanned_at
+        self.status = status
+        self.future: Future = Future()
+
+    @property
+    def key(self) -> Tuple[int, date]:
+        return (self.student_id, wib_date(self.scanned_at))
+
+
+class ScanQueue:
+    """
+    In-process group-commit queue.
+    A background thread flushes pending scans by size or by interval.
+    """
+
+    def __init__(self, batch_size: int, flush_interval_ms: int):
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = max(1, flush_interval_ms) / 1000.0
+        self._pending: Dict[Tuple[int, date], PendingScan] = {}
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+
+    @property
+    def is_running(self) -> bool:
+        return self._running
+
+    def start(self) -> None:
+        """Start the background flusher thread."""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name="scan-queue-flusher", daemon=True)
+        self._thread.start()
+        logger.info(
+            "Scan queue started (batch_size=%s, interval=%sms)",
+            self.batch_size, int(self.flush_interval * 1000)
+        )
+
+    def stop(self) -> None:
+        """Stop the flusher and write out everything still pending."""
+        with self._cond:
+            if not self._running:
+                return
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+        logger.info("Scan queue stopped")
+
+    def submit(self, student_id: int, scanned_at: datetime, status: str = 'Present') -> Future:
+        """
+        Queue a scan. A second scan for the same student on the same day
+        shares the pending entry and resolves as already scanned. Raises
+        ScanQueueStopped once stop() has begun, since nothing would flush it.
+        """
+        pending = PendingScan(student_id, scanned_at, status)
+        with self._cond:
+            if not self._running:
+                raise ScanQueueStopped("Scan queue is not running")
+            existing = self._pending.get(pending.key)
+            if existing is not None:
+                duplicate: Future = Future()
+                existing.future.add_done_callback(
+                    lambda f: _resolve_duplicate(f, duplicate)
+                )
+                return duplicate
+            self._pending[pending.key] = pending
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify()
+        return pending.future
+
+    def flush(self) -> int:
+        """Write all pending scans in a single transaction. Returns rows inserted."""
+        with self._cond:
+            batch = list(self._pending.values())
+            self._pending.clear()
+        if not batch:
+            return 0
+
+        db = SessionLocal()
+        try:
+            recorded = insert_attendance(
+                db, [(p.student_id, p.scanned_at, p.status) for p in batch]
+            )
+            db.commit()
+
+            for pending in batch:
+                attendance_id, inserted = recorded[pending.key]
+                pending.future.set_result((attendance_id, not inserted))
+            return sum(1 for _, inserted in recorded.values() if inserted)
+        except Exception as e:
+            db.rollback()
+            logger.exception("Scan queue flush failed")
+            for pending in batch:
+                if not pending.future.done():
+                    pending.future.set_exception(e)
+            return 0
+        finally:
+            db.close()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if self._running and len(self._pending) < self.batch_size:
+                    self._cond.wait(self.flush_interval)
+                if not self._running:
+                    return
+            self.flush()
+
+
+def _resolve_duplicate(source: Future, target: Future) -> None:
+    if source.exception() is not None:
+        target.set_exception(source.exception())
+    else:
+        attendance_id, _ = source.result()
+        target.set_result((attendance_id, True))
+
+
+scan_queue = ScanQueue(settings.SCAN_QUEUE_BATCH_SIZE, settings.SCAN_QUEUE_FLUSH_INTERVAL_MS)
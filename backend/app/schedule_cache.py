@@ -0,0 +1,72 @@
+"""
+In-memory copy of the class schedules, used to pick Present or Late per scan.
+
+The table is tiny and changes rarely, so it is loaded once at startup and
+reloaded by the class schedule endpoints after every change. Scans read
+thresholds from memory without touching the database.
+
+The cache is per process. With several workers, a change made through one
+worker reaches the others only after they restart.
+"""
+import threading
+from datetime import datetime, time
+from typing import Dict, Optional, Tuple
+from sqlalchemy.orm import Session, selectinload
+from .models import ClassSchedule
+
+DEFAULT_LATE_THRESHOLD = time(7, 30)
+
+
+class ScheduleCache:
+    """class_name -> (is_active, late threshold, {weekday: threshold override})."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._schedules: Optional[Dict[str, Tuple[bool, time, Dict[int, time]]]] = None
+
+    def reload(self, db: Session) -> None:
+        """(Re)load every class schedule with one query (plus one for weekday overrides)."""
+        schedules = db.query(ClassSchedule).options(
+            selectinload(ClassSchedule.weekday_thresholds)
+        ).all()
+        loaded = {
+            schedule.class_name: (
+                bool(schedule.is_active),
+                schedule.late_threshold_time or DEFAULT_LATE_THRESHOLD,
+                {row.weekday: row.late_threshold_time for row in schedule.weekday_thresholds},
+            )
+            for schedule in schedules
+        }
+        with self._lock:
+            self._schedules = loaded
+
+    def late_threshold(self, db: Session, class_name: str, scanned_at: datetime) -> Optional[time]:
+        """
+        Threshold that applies to a scan of `class_name` at WIB time `scanned_at`.
+        Classes without a schedule use the default 07:30; an inactive schedule
+        has no threshold (None).
+        """
+        with self._lock:
+            schedules = self._schedules
+        if schedules is None:
+            self.reload(db)
+            with self._lock:
+                schedules = self._schedules
+
+        schedule = schedules.get(class_name)
+        if schedule is None:
+            return DEFAULT_LATE_THRESHOLD
+        is_active, threshold, weekdays = schedule
+        if not is_active:
+            return None
+        return weekdays.get(scanned_at.weekday(), threshold)
+
+    def scan_status(self, db: Session, class_name: str, scanned_at: datetime) -> str:
+        """'Late' when `scanned_at` (WIB) is after the class threshold, else 'Present'."""
+        threshold = self.late_threshold(db, class_name, scanned_at)
+        if threshold is not None and scanned_at.time() > threshold:
+            return 'Late'
+        return 'Present'
+
+
+schedule_cache = ScheduleCache()
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Dict
 
 
 # ============================================================================
@@ -67,6 +67,11 @@ class AttendanceScan(BaseModel):
     token: str = Field(..., min_length=1)
 
 
+class AttendanceScanItem(AttendanceScan):
+    """One buffered scan replayed by an offline gate scanner."""
+    scanned_at_client: Optional[datetime] = None
+
+
 class AttendanceResponse(BaseModel):
     id: int
     student_id: int
@@ -110,12 +115,28 @@ class SemesterReportItem(BaseModel):
     total_absent: int
     attendance_percentage: float
 
+class ClassMatrixStudent(BaseModel):
+    id: int
+    nis: str
+    name: str
+
+class ClassMatrixResponse(BaseModel):
+    class_name: str
+    month: str  # YYYY-MM
+    statuses: List[str]  # cell code n means statuses[n - 1], 0 = no record
+    days: List[int]  # day of month of each column
+    students: List[ClassMatrixStudent]
+    rows: List[str]  # per student, one code digit per day
+    student_totals: List[List[int]]  # per student, days with each status
+    day_totals: List[List[int]]  # per day, students with each status
+
 # Class Schedule Schemas
 class ClassScheduleResponse(BaseModel):
     id: int
     class_name: str
     late_threshold_time: str  # Time as string HH:MM
     is_active: bool
+    weekday_thresholds: Dict[int, str] = {}  # weekday (0 = Monday) -> HH:MM override
     
     class Config:
         from_attributes = True
@@ -123,6 +144,7 @@ class ClassScheduleResponse(BaseModel):
 class ClassScheduleUpdate(BaseModel):
     late_threshold_time: str  # HH:MM format
     is_active: Optional[bool] = None
+    weekday_thresholds: Optional[Dict[int, str]] = None  # replaces all overrides when given
 
 # Batch Attendance Update
 class AttendanceUpdateItem(BaseModel):
@@ -205,3 +227,22 @@ class ImportSummary(BaseModel):
     failed: int
     duplicates: int
     errors: List[ImportResultRow] = []
+
+
+class RosterChange(BaseModel):
+    action: str  # insert, update or remove
+    student_id: Optional[int] = None
+    nis: str
+    name: str
+    class_name: str
+    old_name: Optional[str] = None
+    old_class_name: Optional[str] = None
+
+
+class RosterSyncSummary(ImportSummary):
+    dry_run: bool
+    inserted: int
+    updated: int
+    unchanged: int
+    removed: int
+    changes: List[RosterChange] = []
@@ -0,0 +1,309 @@
+"""
+Bulk student import from CSV or XLSX uploads.
+
+Rows are read from the upload incrementally and handled in chunks: one
+`nis IN (...)` query per chunk finds NIS values that already exist, a set
+of the NIS values seen so far catches duplicates inside the file, and the
+valid rows of a chunk are inserted with one executemany statement.
+
+sync_roster() is the upsert mode used to re-sync the whole roster (e.g.
+from a Dapodik export): the file is diffed against an in-memory NIS index
+of the students table and the inserts, updates and optional removals are
+applied with a few bulk statements, keeping existing attendance.
+"""
+import csv
+import io
+from datetime import datetime
+from itertools import islice
+from typing import BinaryIO, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from openpyxl import load_workbook
+from sqlalchemy import delete, update
+from sqlalchemy.orm import Session
+from .models import Attendance, Student
+from .schemas import ImportResultRow, ImportSummary, RosterChange, RosterSyncSummary
+from .summaries import count_students, remove_students
+
+IMPORT_CHUNK_SIZE = 500
+IMPORT_EXTENSIONS = (".csv", ".xlsx")
+
+ImportRow = Tuple[int, Dict[str, str]]  # (row number in the file, normalized row)
+
+
+class RosterSyncError(ValueError):
+    """A roster sync that was refused before anything was written."""
+
+
+class RosterEntry(NamedTuple):
+    id: int
+    nis: str
+    name: str
+    class_name: str
+    barcode_token: Optional[str]
+    photo_path: Optional[str]
+
+
+def _cell_text(value) -> str:
+    """Cell value as text; whole numbers (NIS typed as a number in Excel) lose the '.0'."""
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def iter_csv_rows(file: BinaryIO) -> Iterator[ImportRow]:
+    """Rows of a CSV upload, decoded as they are read. Keys are lowercased headers."""
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")  # utf-8-sig handles BOM
+    reader = csv.DictReader(text)
+    try:
+        for row in reader:
+            yield reader.line_num, {
+                key.strip().lower(): (value or "").strip()
+                for key, value in row.items()
+                if key is not None  # surplus cells of over-long rows
+            }
+    finally:
+        text.detach()  # leave the upload open for its owner
+
+
+def iter_xlsx_rows(file: BinaryIO) -> Iterator[ImportRow]:
+    """Rows of the first sheet of an XLSX upload (read-only mode); the first row holds the headers."""
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = [_cell_text(value).lower() for value in next(rows, ())]
+        for row_num, values in enumerate(rows, start=2):
+            if not any(value is not None for value in values):
+                continue
+            yield row_num, {key: _cell_text(value) for key, value in zip(header, values) if key}
+    finally:
+        workbook.close()
+
+
+def iter_upload_rows(file: BinaryIO, extension: str) -> Iterator[ImportRow]:
+    if extension == ".xlsx":
+        return iter_xlsx_rows(file)
+    return iter_csv_rows(file)
+
+
+def iter_chunks(rows: Iterable, size: int = IMPORT_CHUNK_SIZE) -> Iterator[list]:
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def existing_nis(db: Session, nis_values: Iterable[str]) -> set:
+    """The given NIS values that already belong to a student, with one query."""
+    nis_values = set(nis_values)
+    if not nis_values:
+        return set()
+    return {nis for nis, in db.query(Student.nis).filter(Student.nis.in_(nis_values))}
+
+
+def import_rows(db: Session, rows: Iterable[ImportRow]) -> ImportSummary:
+    """
+    Insert new students from (row number, row) pairs with 'nis', 'name' and
+    'class' keys. Rows with missing fields or a NIS that exists (in the
+    table or earlier in the file) are reported and skipped. Does not commit.
+    """
+    total = success = failed = duplicates = 0
+    results: List[ImportResultRow] = []
+    seen = set()
+    now = datetime.utcnow()
+
+    for chunk in iter_chunks(rows):
+        total += len(chunk)
+        in_table = existing_nis(db, (row.get("nis", "").strip() for _, row in chunk))
+        inserts = []
+
+        for row_num, row in chunk:
+            nis = row.get("nis", "").strip()
+            name = row.get("name", "").strip()
+            class_name = row.get("class", "").strip()
+
+            error = None
+            if not nis or not name or not class_name:
+                error = "Missing required fields (NIS, Name, or Class)"
+            elif nis in in_table:
+                error = f"NIS {nis} already exists"
+            elif nis in seen:
+                error = f"NIS {nis} appears more than once in the file"
+
+            if error:
+                failed += 1
+                if nis and name and class_name:
+                    duplicates += 1
+                results.append(ImportResultRow(
+                    row=row_num,
+                    nis=nis or "N/A",
+                    name=name or "N/A",
+                    class_name=class_name or "N/A",
+                    success=False,
+                    error=error
+                ))
+                continue
+
+            seen.add(nis)
+            inserts.append({"nis": nis, "name": name, "class_name": class_name, "created_at": now})
+            success += 1
+            results.append(ImportResultRow(
+                row=row_num,
+                nis=nis,
+                name=name,
+                class_name=class_name,
+                success=True,
+                error=None
+            ))
+
+        if inserts:
+            db.execute(Student.__table__.insert(), inserts)
+
+    return ImportSummary(
+        total_rows=total,
+        success=success,
+        failed=failed,
+        duplicates=duplicates,
+        errors=results
+    )
+
+
+def _roster_index(db: Session) -> Dict[str, RosterEntry]:
+    """All students keyed by NIS, from one query."""
+    rows = db.query(
+        Student.id, Student.nis, Student.name, Student.class_name, Student.barcode_token, Student.photo_path
+    )
+    return {row.nis: RosterEntry(*row) for row in rows}
+
+
+def sync_roster(
+    db: Session,
+    rows: Iterable[ImportRow],
+    remove_missing: bool = False,
+    dry_run: bool = False,
+    expected_removals: Optional[int] = None
+) -> Tuple[RosterSyncSummary, List[RosterEntry]]:
+    """
+    Make the students table match the file: insert new NIS values, update
+    the name and class of existing ones and, with remove_missing, delete
+    students that are not in the file (with their attendance). With dry_run
+    nothing is written. `errors` only holds the rows that were rejected.
+    
+    Removals are refused (RosterSyncError) when any row was rejected or no
+    row was valid, since the file is then not a trustworthy full roster,
+    and a real run must pass the removal count of its dry run as
+    expected_removals. Returns the summary and the removed students, whose
+    stored files the caller deletes after committing. Does not commit.
+    """
+    index = _roster_index(db)
+    seen = set()
+    kept = set()  # NIS values in the file, rejected rows included
+    inserts, updates, changes = [], [], []
+    errors: List[ImportResultRow] = []
+    total = duplicates = unchanged = 0
+    now = datetime.utcnow()
+
+    for row_num, row in rows:
+        total += 1
+        nis = row.get("nis", "").strip()
+        name = row.get("name", "").strip()
+        class_name = row.get("class", "").strip()
+
+        error = None
+        if not nis or not name or not class_name:
+            error = "Missing required fields (NIS, Name, or Class)"
+        elif nis in seen:
+            duplicates += 1
+            error = f"NIS {nis} appears more than once in the file"
+        if nis:
+            kept.add(nis)
+        if error:
+            errors.append(ImportResultRow(
+                row=row_num,
+                nis=nis or "N/A",
+                name=name or "N/A",
+                class_name=class_name or "N/A",
+                success=False,
+                error=error
+            ))
+            continue
+        seen.add(nis)
+
+        existing = index.get(nis)
+        if existing is None:
+            inserts.append({"nis": nis, "name": name, "class_name": class_name, "created_at": now})
+            changes.append(RosterChange(action="insert", nis=nis, name=name, class_name=class_name))
+        elif (existing.name, existing.class_name) != (name, class_name):
+            updates.append({"id": existing.id, "name": name, "class_name": class_name})
+            changes.append(RosterChange(
+                action="update",
+                student_id=existing.id,
+                nis=nis,
+                name=name,
+                class_name=class_name,
+                old_name=existing.name,
+                old_class_name=existing.class_name
+            ))
+        else:
+            unchanged += 1
+
+    removals = []
+    if remove_missing:
+        if not seen and not errors:
+            raise RosterSyncError("remove_missing refused: the file has no student rows")
+        if errors or not seen:
+            raise RosterSyncError(
+                f"remove_missing refused: {len(errors)} of {total} rows were rejected "
+                f"(check the nis, name and class columns); import without remove_missing to see them"
+            )
+        removals = [entry for nis, entry in index.items() if nis not in kept]
+        if not dry_run and expected_removals != len(removals):
+            raise RosterSyncError(
+                f"remove_missing would delete {len(removals)} students, but expected_removals is "
+                f"{expected_removals}; run with dry_run=true first and pass its removed count"
+            )
+    changes.extend(
+        RosterChange(action="remove", student_id=entry.id, nis=entry.nis, name=entry.name, class_name=entry.class_name)
+        for entry in removals
+    )
+
+    if not dry_run:
+        _apply_roster(db, index, inserts, updates, removals)
+
+    summary = RosterSyncSummary(
+        total_rows=total,
+        success=len(inserts) + len(updates) + unchanged,
+        failed=len(errors),
+        duplicates=duplicates,
+        errors=errors,
+        dry_run=dry_run,
+        inserted=len(inserts),
+        updated=len(updates),
+        unchanged=unchanged,
+        removed=len(removals),
+        changes=changes
+    )
+    return summary, removals
+
+
+def _apply_roster(
+    db: Session, index: Dict[str, RosterEntry], inserts: List[dict], updates: List[dict], removals: List[RosterEntry]
+) -> None:
+    by_id = {entry.id: entry for entry in index.values()}
+    for chunk in iter_chunks(removals):
+        student_ids = [entry.id for entry in chunk]
+        remove_students(db, student_ids)
+        db.execute(delete(Attendance).where(Attendance.student_id.in_(student_ids)))
+        db.execute(delete(Student).where(Student.id.in_(student_ids)))
+
+    for chunk in iter_chunks(updates):
+        # Daily counters are per class: move the attendance of students changing class
+        moved = [values["id"] for values in chunk if values["class_name"] != by_id[values["id"]].class_name]
+        count_students(db, moved, sign=-1)
+        db.execute(update(Student), chunk)
+        count_students(db, moved)
+
+    for chunk in iter_chunks(inserts):
+        db.execute(Student.__table__.insert(), chunk)
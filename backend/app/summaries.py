@@ -0,0 +1,216 @@
+"""
+Materialized attendance counters.
+
+Two rollups count active (non-undone) attendance records:
+
+- attendance_daily_summary: per (attendance_date, class_name, status), read
+  by the dashboard statistics.
+- student_period_summary: per (student_id, year, semester, status), read by
+  the semester report.
+
+Every write path adjusts both in the same transaction as the attendance
+change, so reads are a small sum instead of an aggregate over attendance.
+
+rebuild_summaries() recomputes them from scratch for repair, either from
+`python init_db.py rebuild-summaries` or in a background thread started
+with rebuild_job.start(). It works in short per-chunk transactions, so scans
+keep being written while it runs.
+"""
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+from sqlalchemy import select, func, delete, case, extract, text
+from sqlalchemy.orm import Session
+from .database import SessionLocal, dialect_insert
+from .models import Attendance, AttendanceDailySummary, Student, StudentPeriodSummary
+
+logger = logging.getLogger(__name__)
+
+_DAILY = AttendanceDailySummary.__table__
+_DAILY_KEY = ["attendance_date", "class_name", "status"]
+_PERIOD = StudentPeriodSummary.__table__
+_PERIOD_KEY = ["student_id", "year", "semester", "status"]
+REBUILD_CHUNK = 25  # dates or students recomputed per transaction
+REBUILD_PAUSE = 0.1  # seconds between chunks on SQLite, longer than its busy-handler sleep
+
+
+def _daily_counts(condition, sign: int = 1):
+    """(attendance_date, class_name, status, count * sign) of the active attendance matching `condition`."""
+    return (
+        select(
+            Attendance.attendance_date,
+            Student.class_name,
+            Attendance.status,
+            func.count(Attendance.id) * sign,
+        )
+        .join(Student, Student.id == Attendance.student_id)
+        .where(Attendance.is_undone == False, condition)
+        .group_by(Attendance.attendance_date, Student.class_name, Attendance.status)
+    )
+
+
+def _period_counts(condition, sign: int = 1):
+    """(student_id, year, semester, status, count * sign) of the active attendance matching `condition`."""
+    year = extract('year', Attendance.attendance_date)
+    semester = case((extract('month', Attendance.attendance_date) >= 7, 1), else_=2)
+    return (
+        select(
+            Attendance.student_id,
+            year,
+            semester,
+            Attendance.status,
+            func.count(Attendance.id) * sign,
+        )
+        .where(Attendance.is_undone == False, condition)
+        .group_by(Attendance.student_id, year, semester, Attendance.status)
+    )
+
+
+def _upsert_counts(db: Session, table, key_columns, counts) -> None:
+    """Add the rows of the `counts` select to `table`'s counters."""
+    stmt = dialect_insert(table).from_select(key_columns + ["count"], counts)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=key_columns,
+        set_={"count": table.c.count + stmt.excluded.count},
+    )
+    db.execute(stmt)
+
+
+def _apply(db: Session, condition, sign: int) -> None:
+    """Add (sign=1) or subtract (sign=-1) the rows matching `condition` to both rollups."""
+    _upsert_counts(db, _DAILY, _DAILY_KEY, _daily_counts(condition, sign))
+    _upsert_counts(db, _PERIOD, _PERIOD_KEY, _period_counts(condition, sign))
+
+
+def count_attendance(db: Session, attendance_ids: Iterable[int], sign: int = 1) -> None:
+    """
+    Add the given attendance records to the counters, or remove them with
+    sign=-1. Only records that are currently active are counted, so call it
+    after an insert and before an undo. Does not commit.
+    """
+    attendance_ids = list(attendance_ids)
+    if attendance_ids:
+        _apply(db, Attendance.id.in_(attendance_ids), sign)
+
+
+def count_student(db: Session, student_id: int, sign: int = 1) -> None:
+    """
+    Add or remove all active attendance of one student from the per-class
+    daily counters, around a class change. Does not commit.
+    """
+    count_students(db, [student_id], sign)
+
+
+def count_students(db: Session, student_ids: Iterable[int], sign: int = 1) -> None:
+    """count_student() for several students with one statement. Does not commit."""
+    student_ids = list(student_ids)
+    if student_ids:
+        _upsert_counts(db, _DAILY, _DAILY_KEY, _daily_counts(Attendance.student_id.in_(student_ids), sign))
+
+
+def remove_student(db: Session, student_id: int) -> None:
+    """Take a student about to be deleted out of both rollups. Does not commit."""
+    remove_students(db, [student_id])
+
+
+def remove_students(db: Session, student_ids: Iterable[int]) -> None:
+    """remove_student() for several students at once. Does not commit."""
+    student_ids = list(student_ids)
+    if student_ids:
+        count_students(db, student_ids, sign=-1)
+        db.execute(delete(_PERIOD).where(_PERIOD.c.student_id.in_(student_ids)))
+
+
+def _rebuild(db: Session, table, key_columns, counts, column, table_column) -> int:
+    """
+    Recompute `table` in short transactions, REBUILD_CHUNK values of
+    `column` (attendance dates or students) at a time. Each chunk's counter
+    rows are deleted and recomputed from attendance in one transaction, so
+    concurrent writers (which hold SQLite's single write lock) only wait for
+    one chunk and their increments land on the rebuilt rows. SQLite does
+    not queue lock waiters, so it pauses between chunks to let them in.
+    """
+    keys = select(column).where(column.isnot(None)).union(select(table_column))
+    keys = sorted(key for key, in db.execute(keys))
+    db.commit()
+    for start in range(0, len(keys), REBUILD_CHUNK):
+        chunk = keys[start:start + REBUILD_CHUNK]
+        if db.bind.dialect.name == "postgresql":
+            db.execute(text(f"LOCK TABLE {table.name} IN EXCLUSIVE MODE"))
+        db.execute(delete(table).where(table_column.in_(chunk)))
+        db.execute(table.insert().from_select(key_columns + ["count"], counts(column.in_(chunk))))
+        db.commit()
+        if db.bind.dialect.name == "sqlite":
+            time.sleep(REBUILD_PAUSE)
+    return db.query(func.count()).select_from(table).scalar()
+
+
+def rebuild_daily_summary(db: Session) -> int:
+    """Recompute attendance_daily_summary from the attendance table. Returns the row count."""
+    return _rebuild(db, _DAILY, _DAILY_KEY, _daily_counts, Attendance.attendance_date, _DAILY.c.attendance_date)
+
+
+def rebuild_period_summary(db: Session) -> int:
+    """Recompute student_period_summary from the attendance table. Returns the row count."""
+    return _rebuild(db, _PERIOD, _PERIOD_KEY, _period_counts, Attendance.student_id, _PERIOD.c.student_id)
+
+
+def rebuild_summaries(db: Session) -> Dict[str, int]:
+    """Recompute both rollups. Returns the row count of each table."""
+    return {
+        _DAILY.name: rebuild_daily_summary(db),
+        _PERIOD.name: rebuild_period_summary(db),
+    }
+
+
+class RebuildJob:
+    """Runs rebuild_summaries() in a background thread, one at a time."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.rows: Optional[Dict[str, int]] = None
+        self.error: Optional[str] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> bool:
+        """Start a rebuild. Returns False if one is already running."""
+        with self._lock:
+            if self.is_running:
+                return False
+            self.started_at, self.finished_at, self.error = datetime.utcnow(), None, None
+            self._thread = threading.Thread(target=self._run, name="summary-rebuild", daemon=True)
+            self._thread.start()
+            return True
+
+    def _run(self) -> None:
+        db = SessionLocal()
+        try:
+            self.rows = rebuild_summaries(db)
+            logger.info("Rebuilt attendance summaries: %s", self.rows)
+        except Exception as e:
+            db.rollback()
+            self.error = str(e)
+            logger.exception("Summary rebuild failed")
+        finally:
+            db.close()
+            self.finished_at = datetime.utcnow()
+
+    def status(self) -> dict:
+        return {
+            "running": self.is_running,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "rows": self.rows,
+            "error": self.error,
+        }
+
+
+rebuild_job = RebuildJob()
@@ -1,7 +1,7 @@
 """
 Timezone utilities for WIB (Western Indonesian Time - UTC+7)
 """
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, date, timezone, timedelta
 import pytz
 
 # WIB Timezone (Asia/Jakarta)
@@ -25,6 +25,12 @@ def from_wib_to_utc(dt: datetime) -> datetime:
         dt = WIB.localize(dt)
     return dt.astimezone(pytz.UTC)
 
+def wib_date(dt: datetime) -> date:
+    """WIB calendar date of a datetime. Naive values are WIB wall-clock time, as stored in the database."""
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(WIB)
+    return dt.date()
+
 def wib_time_now() -> str:
     """Get current time in WIB as HH:MM string."""
     return get_wib_now().strftime('%H:%M')
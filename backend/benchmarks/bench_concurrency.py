@@ -0,0 +1,122 @@
+"""
+Concurrency benchmark: scan latency while semester reports are running.
+
+Seeds a throwaway database, starts the API under uvicorn and measures
+POST /api/attendance/scan latency first on its own and then while other
+clients keep requesting /api/reports/semester. With blocking database work
+kept off the event loop, scan p99 should stay roughly flat between the two
+phases.
+
+Usage (from the backend directory, needs httpx):
+    python benchmarks/bench_concurrency.py [--students 600] [--history-days 120]
+        [--scanners 8] [--report-clients 4] [--duration 10] [--database-url URL]
+"""
+import os
+import sys
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Scan latency under concurrent report load")
+    parser.add_argument("--students", type=int, default=600)
+    parser.add_argument("--history-days", type=int, default=120)
+    parser.add_argument("--scanners", type=int, default=8)
+    parser.add_argument("--report-clients", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per phase")
+    parser.add_argument("--database-url", default=None, help="defaults to a temporary SQLite file")
+    return parser.parse_args()
+
+
+async def login(client, username: str, password: str) -> dict:
+    response = await client.post("/api/auth/login", data={"username": username, "password": password})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def scanner(client, headers, tokens, cursor, stop_at, samples):
+    while time.perf_counter() < stop_at:
+        token = tokens[next(cursor) % len(tokens)]
+        start = time.perf_counter()
+        response = await client.post("/api/attendance/scan", json={"token": token}, headers=headers)
+        samples.append((time.perf_counter() - start) * 1000)
+        response.raise_for_status()
+
+
+async def reporter(client, headers, params, stop_at, samples):
+    while time.perf_counter() < stop_at:
+        start = time.perf_counter()
+        response = await client.get("/api/reports/semester", params=params, headers=headers)
+        samples.append((time.perf_counter() - start) * 1000)
+        response.raise_for_status()
+
+
+async def run_phase(base_url, headers, tokens, cursor, args, with_reports, report_params):
+    import httpx
+
+    scan_samples, report_samples = [], []
+    limits = httpx.Limits(max_connections=args.scanners + args.report_clients)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        stop_at = time.perf_counter() + args.duration
+        tasks = [scanner(client, headers, tokens, cursor, stop_at, scan_samples) for _ in range(args.scanners)]
+        if with_reports:
+            tasks += [reporter(client, headers, report_params, stop_at, report_samples)
+                      for _ in range(args.report_clients)]
+        await asyncio.gather(*tasks)
+    return scan_samples, report_samples
+
+
+async def main_async(args, tokens):
+    import httpx
+    from itertools import count
+    from common import UvicornServer, ADMIN_USERNAME, ADMIN_PASSWORD, percentiles
+    from app.timezone_utils import get_wib_now
+
+    now = get_wib_now()
+    report_params = {"semester": 1 if now.month >= 7 else 2, "year": now.year}
+
+    with UvicornServer({"DATABASE_URL": os.environ["DATABASE_URL"]}) as server:
+        async with httpx.AsyncClient(base_url=server.url) as client:
+            headers = await login(client, ADMIN_USERNAME, ADMIN_PASSWORD)
+
+        cursor = count()
+        scan_only, _ = await run_phase(server.url, headers, tokens, cursor, args, False, report_params)
+        scan_loaded, reports = await run_phase(server.url, headers, tokens, cursor, args, True, report_params)
+
+    return {
+        "benchmark": "scan_latency_under_report_load",
+        "database": os.environ["DATABASE_URL"].split("://")[0],
+        "students": args.students,
+        "history_days": args.history_days,
+        "scanners": args.scanners,
+        "report_clients": args.report_clients,
+        "phase_seconds": args.duration,
+        "scan_only_ms": percentiles(scan_only),
+        "scan_with_reports_ms": percentiles(scan_loaded),
+        "semester_report_ms": percentiles(reports),
+    }
+
+
+def main():
+    args = parse_args()
+    tmpdir = None
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        tmpdir = tempfile.mkdtemp(prefix="absensi-bench-")
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmpdir, 'bench.sqlite3')}"
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from common import seed_database
+
+    print(f"Seeding {args.students} students, {args.history_days} days of history...", file=sys.stderr)
+    tokens = seed_database(args.students, history_days=args.history_days)
+    result = asyncio.run(main_async(args, tokens))
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
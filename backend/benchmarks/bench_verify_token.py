@@ -0,0 +1,60 @@
+"""
+Micro-benchmark for barcode.verify_token.
+
+Compares the uncached verification path with cache hits and cache misses.
+
+Usage (from the backend directory):
+    python benchmarks/bench_verify_token.py [--students 1000] [--rounds 20000]
+"""
+import sys
+import os
+import argparse
+import time
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.barcode import generate_token, verify_token, token_cache, _verify_token_uncached
+
+
+def time_per_call(fn, tokens, rounds: int) -> float:
+    """Return microseconds per call of fn over `rounds` calls cycling through tokens."""
+    n = len(tokens)
+    start = time.perf_counter()
+    for i in range(rounds):
+        fn(tokens[i % n])
+    return (time.perf_counter() - start) / rounds * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="verify_token micro-benchmark")
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=20000)
+    args = parser.parse_args()
+
+    tokens = [generate_token(str(i))[0] for i in range(args.students)]
+
+    uncached = time_per_call(_verify_token_uncached, tokens, args.rounds)
+
+    # Misses: every call sees a token that is not cached yet
+    token_cache.clear()
+    fresh = [generate_token(str(i))[0] for i in range(args.rounds)]
+    start = time.perf_counter()
+    for token in fresh:
+        verify_token(token)
+    miss = (time.perf_counter() - start) / len(fresh) * 1_000_000
+
+    # Hits: warm the cache with the school's tokens, then verify them again
+    token_cache.clear()
+    for token in tokens:
+        verify_token(token)
+    hit = time_per_call(verify_token, tokens, args.rounds)
+
+    print(f"students={args.students} rounds={args.rounds} cache_size={token_cache.maxsize}")
+    print(f"uncached : {uncached:8.2f} us/verify")
+    print(f"miss     : {miss:8.2f} us/verify")
+    print(f"hit      : {hit:8.2f} us/verify  ({uncached / hit:.1f}x faster than uncached)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Regression check for the number of SQL statements per list endpoint.
+
+Seeds a small throwaway database, calls each endpoint with a small and a
+large page and counts the statements it runs (after a warm-up request, so
+the auth and schedule caches are filled). Exits non-zero when an endpoint
+runs more statements than its budget, or more for the large page than for
+the small one, which is what a per-row lazy load (N+1) looks like.
+
+Usage (from the backend directory, needs httpx):
+    python benchmarks/check_query_counts.py [--database-url URL]
+"""
+import os
+import sys
+import argparse
+import contextlib
+import tempfile
+
+# (label, path, small page params, large page params, statement budget);
+# class 9Z has no students
+ENDPOINTS = [
+    ("history", "/api/attendance/history", {"limit": 10}, {"limit": 500}, 1),
+    ("history + total", "/api/attendance/history",
+     {"limit": 10, "include_total": "true"}, {"limit": 500, "include_total": "true"}, 2),
+    ("class attendance", "/api/attendance/class-attendance",
+     {"class_name": "9Z", "date": "{yesterday}"}, {"class_name": "1A", "date": "{yesterday}"}, 1),
+    ("students", "/api/students", {"limit": 10}, {"limit": 500}, 1),
+    ("students by class", "/api/students",
+     {"class_name": "1A", "sort": "name", "limit": 10, "include_total": "true", "fields": "nis,name"},
+     {"class_name": "1A", "sort": "name", "limit": 500, "include_total": "true", "fields": "nis,name"}, 2),
+    ("semester report", "/api/reports/semester",
+     {"semester": "{semester}", "year": "{year}", "class_name": "1A"},
+     {"semester": "{semester}", "year": "{year}"}, 1),
+    ("class matrix", "/api/reports/class-matrix",
+     {"class_name": "9Z", "month": "{month}"}, {"class_name": "1A", "month": "{month}"}, 1),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Statements per list endpoint")
+    parser.add_argument("--database-url", default=None, help="defaults to a temporary SQLite file")
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        tmpdir = tempfile.mkdtemp(prefix="absensi-check-")
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmpdir, 'check.sqlite3')}"
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from datetime import timedelta
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+    from common import seed_database, ADMIN_USERNAME, ADMIN_PASSWORD
+    from app.database import engine
+    from app.main import app
+    from app.timezone_utils import get_wib_now
+
+    seed_database(students=150, classes=2, history_days=5)
+    now = get_wib_now()
+    values = {
+        "yesterday": (now - timedelta(days=1)).strftime("%Y-%m-%d"),
+        "month": now.strftime("%Y-%m"),
+        "semester": 1 if now.month >= 7 else 2,
+        "year": now.year,
+    }
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    lines, failures = [], []
+    # Keep the app's startup messages out of the report
+    with contextlib.redirect_stdout(sys.stderr), TestClient(app) as client:
+        response = client.post("/api/auth/login", data={"username": ADMIN_USERNAME, "password": ADMIN_PASSWORD})
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        def count(path, params):
+            params = {key: str(value).format(**values) for key, value in params.items()}
+            statements.clear()
+            response = client.get(path, params=params, headers=headers)
+            response.raise_for_status()
+            body = response.json()
+            rows = body if isinstance(body, list) else body["students"]
+            return len(statements), len(rows)
+
+        for label, path, small, large, budget in ENDPOINTS:
+            count(path, small)  # warm-up
+            small_count, small_rows = count(path, small)
+            large_count, large_rows = count(path, large)
+            lines.append(f"{label:18} {small_rows:4} rows: {small_count} statements, "
+                         f"{large_rows:4} rows: {large_count} statements (budget {budget})")
+            if max(small_count, large_count) > budget:
+                failures.append(f"{label}: over budget")
+            if large_count > small_count:
+                failures.append(f"{label}: statements grow with rows")
+
+    for line in lines:
+        print(line)
+    if failures:
+        print("FAILED: " + "; ".join(failures))
+        sys.exit(1)
+    print("OK: statement counts are within budget and do not grow with rows")
+
+
+if __name__ == "__main__":
+    main()
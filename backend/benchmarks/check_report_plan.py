@@ -0,0 +1,100 @@
+"""
+Regression check for the semester report query plan.
+
+Seeds a small throwaway database, runs EXPLAIN on the semester report query
+(all classes and a single class) and exits non-zero when the plan reads the
+attendance table with a full scan instead of an index range search. It also
+checks that students without attendance in the semester are still listed.
+
+Usage (from the backend directory):
+    python benchmarks/check_report_plan.py [--database-url URL]
+
+On Postgres sequential scans are disabled for the EXPLAIN, so the check
+fails only when no usable index exists.
+"""
+import os
+import sys
+import argparse
+import re
+import tempfile
+
+
+def explain(db, query) -> list:
+    """Plan lines for a SQLAlchemy query on SQLite or Postgres."""
+    from sqlalchemy import text
+
+    compiled = query.statement.compile(db.bind, compile_kwargs={"literal_binds": True})
+    if db.bind.dialect.name == "postgresql":
+        db.execute(text("SET LOCAL enable_seqscan = off"))
+        rows = db.execute(text(f"EXPLAIN {compiled}")).all()
+        db.rollback()
+        return [row[0] for row in rows]
+    return [row[-1] for row in db.execute(text(f"EXPLAIN QUERY PLAN {compiled}"))]
+
+
+def full_scans(plan: list) -> list:
+    """Plan lines that read every attendance row."""
+    pattern = re.compile(r"^\s*(SCAN attendance\b|.*Seq Scan on attendance\b)")
+    return [line for line in plan if pattern.match(line)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Semester report EXPLAIN check")
+    parser.add_argument("--database-url", default=None, help="defaults to a temporary SQLite file")
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        tmpdir = tempfile.mkdtemp(prefix="absensi-check-")
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmpdir, 'check.sqlite3')}"
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from sqlalchemy import text
+    from common import seed_database
+    from app.database import SessionLocal
+    from app.models import Student
+    from app.routes.reports import build_semester_report_query
+    from app.timezone_utils import get_wib_now
+
+    seed_database(students=240, history_days=30)
+    now = get_wib_now()
+    semester, year = (1 if now.month >= 7 else 2), now.year
+
+    db = SessionLocal()
+    failures = []
+    try:
+        # A student with no attendance at all must still appear
+        db.add(Student(nis="999999", name="Tanpa Absen", class_name="1A"))
+        db.commit()
+        if db.bind.dialect.name == "postgresql":
+            db.execute(text("ANALYZE"))
+            db.commit()
+
+        for label, classes in [("all classes", None), ("class 1A", ["1A"])]:
+            query = build_semester_report_query(db, semester, year, classes)
+            plan = explain(db, query)
+            print(f"[{label}]")
+            for line in plan:
+                print(f"    {line}")
+            if full_scans(plan):
+                failures.append(f"{label}: full scan of attendance")
+
+            students = db.query(Student)
+            if classes:
+                students = students.filter(Student.class_name.in_(classes))
+            expected = students.count()
+            rows = query.all()
+            if len(rows) != expected:
+                failures.append(f"{label}: {len(rows)} report rows for {expected} students")
+    finally:
+        db.close()
+
+    if failures:
+        print("FAILED: " + "; ".join(failures))
+        sys.exit(1)
+    print("OK: semester report uses index range scans and keeps every student")
+
+
+if __name__ == "__main__":
+    main()
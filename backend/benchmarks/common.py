@@ -0,0 +1,160 @@
+"""
+Shared helpers for the benchmark scripts: database seeding, a throwaway
+uvicorn server and latency statistics.
+
+Import this module only after DATABASE_URL points at the benchmark database;
+the app settings are read once at import time.
+"""
+import sys
+import os
+import random
+import socket
+import subprocess
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from app.database import Base, engine, SessionLocal
+from app.models import User, Student, Attendance, ClassSchedule
+from app.auth import hash_password
+from app.barcode import generate_token
+from app.summaries import rebuild_summaries
+from app.timezone_utils import get_wib_now
+
+ADMIN_USERNAME = "bench-admin"
+ADMIN_PASSWORD = "bench-admin-123"
+STATUSES = ["Present"] * 85 + ["Late"] * 8 + ["Sick"] * 3 + ["Permission"] * 2 + ["Absent"] * 2
+
+
+def seed_database(students: int, classes: int = 12, history_days: int = 0, seed: int = 42) -> List[str]:
+    """
+    Recreate all tables and fill them with `students` students spread over
+    `classes` classes, plus `history_days` school days of past attendance.
+    Returns the QR token of every student (index = student id - 1).
+    """
+    rng = random.Random(seed)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    class_names = [f"{grade}{section}" for grade in range(1, 7) for section in "ABCDEF"][:classes]
+    now = datetime.utcnow()
+
+    tokens = []
+    student_rows = []
+    for student_id in range(1, students + 1):
+        token, nonce = generate_token(str(student_id))
+        tokens.append(token)
+        student_rows.append({
+            "id": student_id,
+            "nis": f"{100000 + student_id}",
+            "name": f"Siswa {student_id:05d}",
+            "class_name": class_names[(student_id - 1) % len(class_names)],
+            "barcode_token": token,
+            "barcode_nonce": nonce,
+            "barcode_generated_at": now,
+            "created_at": now,
+        })
+
+    today = get_wib_now().replace(tzinfo=None, hour=0, minute=0, second=0, microsecond=0)
+    attendance_rows = []
+    day = today
+    school_days = 0
+    while school_days < history_days:
+        day -= timedelta(days=1)
+        if day.weekday() >= 5:
+            continue
+        school_days += 1
+        for student_id in range(1, students + 1):
+            scanned_at = day + timedelta(hours=6, minutes=30, seconds=rng.randint(0, 3600))
+            attendance_rows.append({
+                "student_id": student_id,
+                "scanned_at": scanned_at,
+                "attendance_date": scanned_at.date(),
+                "status": rng.choice(STATUSES),
+                "is_undone": False,
+                "created_at": scanned_at,
+            })
+
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [{
+            "username": ADMIN_USERNAME,
+            "hashed_password": hash_password(ADMIN_PASSWORD),
+            "role": "admin",
+            "is_active": True,
+            "created_at": now,
+        }])
+        conn.execute(ClassSchedule.__table__.insert(), [
+            {"class_name": name, "is_active": True, "created_at": now, "updated_at": now}
+            for name in class_names
+        ])
+        conn.execute(Student.__table__.insert(), student_rows)
+        for start in range(0, len(attendance_rows), 10000):
+            conn.execute(Attendance.__table__.insert(), attendance_rows[start:start + 10000])
+
+    with SessionLocal() as db:
+        rebuild_summaries(db)
+
+    return tokens
+
+
+def percentiles(samples_ms: List[float]) -> Dict[str, float]:
+    """Summary statistics (milliseconds) for a list of latencies."""
+    if not samples_ms:
+        return {"count": 0}
+    ordered = sorted(samples_ms)
+
+    def pick(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))], 2)
+
+    return {
+        "count": len(ordered),
+        "mean": round(sum(ordered) / len(ordered), 2),
+        "p50": pick(50),
+        "p95": pick(95),
+        "p99": pick(99),
+        "max": round(ordered[-1], 2),
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class UvicornServer:
+    """Run the API under uvicorn in a subprocess for the duration of a `with` block."""
+
+    def __init__(self, env: Dict[str, str], workers: int = 1):
+        self.port = free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.env = {**os.environ, **env}
+        self.workers = workers
+        self.process = None
+
+    def __enter__(self) -> "UvicornServer":
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app",
+             "--port", str(self.port), "--workers", str(self.workers), "--log-level", "warning"],
+            cwd=BACKEND_DIR,
+            env=self.env,
+            stdout=sys.stderr,  # keep server output away from the JSON results
+        )
+        deadline = time.time() + 30
+        while time.time() < deadline:
+            try:
+                with socket.create_connection(("127.0.0.1", self.port), timeout=0.5):
+                    return self
+            except OSError:
+                time.sleep(0.1)
+        self.__exit__(None, None, None)
+        raise RuntimeError("uvicorn did not start")
+
+    def __exit__(self, *exc) -> None:
+        if self.process is not None:
+            self.process.terminate()
+            self.process.wait(timeout=30)
+            self.process = None
@@ -0,0 +1,72 @@
+"""
+Shared fixtures for the API tests.
+
+The app reads its settings once at import time, so the environment points
+it at a throwaway SQLite database and storage directory before anything
+from `app` is imported. The database lives for the whole session; tests
+create their own students with unique NIS values and class names.
+"""
+import itertools
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+TEST_DIR = tempfile.mkdtemp(prefix="absensi-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TEST_DIR, 'test.sqlite3')}"
+os.environ["STORAGE_PATH"] = os.path.join(TEST_DIR, "storage")
+os.environ["QR_RENDER_WORKERS"] = "1"
+
+from fastapi.testclient import TestClient  # noqa: E402
+from app.auth import hash_password  # noqa: E402
+from app.barcode import generate_token  # noqa: E402
+from app.database import Base, SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.migrations import run_migrations  # noqa: E402
+from app.models import Student, User  # noqa: E402
+
+ADMIN_USERNAME = "test-admin"
+ADMIN_PASSWORD = "test-admin-123"
+
+_nis = itertools.count(900001)
+
+
+@pytest.fixture(scope="session")
+def client():
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    with SessionLocal() as db:
+        db.add(User(username=ADMIN_USERNAME, hashed_password=hash_password(ADMIN_PASSWORD), role="admin"))
+        db.commit()
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture(scope="session")
+def admin_headers(client):
+    response = client.post("/api/auth/login", data={"username": ADMIN_USERNAME, "password": ADMIN_PASSWORD})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture
+def make_students(client):
+    """Create `count` students in `class_name` with QR tokens; returns [(id, token)]."""
+    def make(class_name: str, count: int = 1):
+        with SessionLocal() as db:
+            students = [
+                Student(nis=str(next(_nis)), name=f"Siswa {index}", class_name=class_name)
+                for index in range(count)
+            ]
+            db.add_all(students)
+            db.flush()
+            created = []
+            for student in students:
+                student.barcode_token, student.barcode_nonce = generate_token(str(student.id))
+                created.append((student.id, student.barcode_token))
+            db.commit()
+        return created
+    return make
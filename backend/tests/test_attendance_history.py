@@ -0,0 +1,36 @@
+import json
+from datetime import timedelta
+
+import pytest
+
+from app.pagination import MAX_PAGE_SIZE
+from app.timezone_utils import get_wib_now
+
+
+@pytest.mark.parametrize("limit", [-1, 0, MAX_PAGE_SIZE + 1])
+def test_history_rejects_out_of_range_limit(client, admin_headers, limit):
+    response = client.get("/api/attendance/history", params={"limit": limit}, headers=admin_headers)
+    assert response.status_code == 422
+
+
+def test_history_pages_and_stream_agree(client, admin_headers, make_students):
+    students = make_students("History-A", 3)
+    now = get_wib_now()
+    client.post("/api/attendance/scan-batch", headers=admin_headers, json=[
+        {"token": token, "scanned_at_client": (now - timedelta(minutes=index)).isoformat()}
+        for index, (_, token) in enumerate(students)
+    ])
+    params = {"class_name": "History-A", "include_total": "true"}
+
+    first = client.get("/api/attendance/history", params={**params, "limit": 2}, headers=admin_headers)
+    assert first.status_code == 200
+    assert len(first.json()) == 2
+    assert first.headers["x-total-count"] == "3"
+    rest = client.get("/api/attendance/history", headers=admin_headers,
+                      params={**params, "limit": 2, "cursor": first.headers["x-next-cursor"]})
+    assert len(rest.json()) == 1
+    assert "x-next-cursor" not in rest.headers
+
+    streamed = client.get("/api/attendance/history", params={**params, "stream": "true"}, headers=admin_headers)
+    rows = [json.loads(line) for line in streamed.text.splitlines()]
+    assert [row["id"] for row in rows] == [row["id"] for row in first.json() + rest.json()]
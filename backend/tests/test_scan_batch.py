@@ -0,0 +1,28 @@
+from datetime import timedelta
+
+from app.database import SessionLocal
+from app.models import Attendance, AttendanceDailySummary
+from app.timezone_utils import get_wib_now
+
+
+def test_scan_batch_rejects_scans_older_than_the_replay_window(client, admin_headers, make_students):
+    (stale_id, stale_token), (recent_id, recent_token) = make_students("Replay-A", 2)
+    recent = get_wib_now() - timedelta(minutes=5)
+
+    response = client.post("/api/attendance/scan-batch", headers=admin_headers, json=[
+        {"token": stale_token, "scanned_at_client": "2020-01-01T07:00:00+07:00"},
+        {"token": recent_token, "scanned_at_client": recent.isoformat()},
+    ])
+
+    assert response.status_code == 200
+    stale, fresh = response.json()
+    assert not stale["success"]
+    assert "replay window" in stale["message"]
+    assert fresh["success"]
+    with SessionLocal() as db:
+        assert db.query(Attendance).filter(Attendance.student_id == stale_id).count() == 0
+        assert db.query(Attendance).filter(Attendance.student_id == recent_id).count() == 1
+        assert db.query(AttendanceDailySummary).filter(
+            AttendanceDailySummary.class_name == "Replay-A",
+            AttendanceDailySummary.attendance_date < recent.date() - timedelta(days=1)
+        ).count() == 0
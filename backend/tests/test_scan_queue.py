@@ -0,0 +1,35 @@
+from datetime import datetime
+
+import pytest
+
+from app.database import SessionLocal
+from app.models import Attendance
+from app.scan_queue import ScanQueue, ScanQueueStopped
+from app.timezone_utils import WIB
+
+
+def test_submit_after_stop_raises(make_students):
+    (student_id, _), = make_students("Queue-A")
+    queue = ScanQueue(batch_size=50, flush_interval_ms=60000)
+    queue.start()
+    before_stop = queue.submit(student_id, WIB.localize(datetime(2026, 9, 1, 7, 0)))
+    queue.stop()
+
+    # The final flush of stop() resolves scans queued before it
+    attendance_id, already_scanned = before_stop.result(timeout=5)
+    assert attendance_id and not already_scanned
+    with pytest.raises(ScanQueueStopped):
+        queue.submit(student_id, WIB.localize(datetime(2026, 9, 2, 7, 0)))
+
+
+def test_scan_is_written_directly_when_the_queue_stops_mid_request(client, admin_headers, make_students, monkeypatch):
+    (student_id, token), = make_students("Queue-B")
+    # The route saw a running queue, but stop() ran before its submit()
+    monkeypatch.setattr(ScanQueue, "is_running", property(lambda queue: True))
+
+    response = client.post("/api/attendance/scan", headers=admin_headers, json={"token": token})
+
+    assert response.status_code == 200
+    assert response.json()["success"]
+    with SessionLocal() as db:
+        assert db.query(Attendance).filter(Attendance.student_id == student_id).count() == 1
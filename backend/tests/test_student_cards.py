@@ -0,0 +1,15 @@
+from urllib.parse import quote
+
+
+def test_cards_pdf_with_non_ascii_class_name(client, admin_headers, make_students):
+    class_name = 'XI "Unggulan" – Ünggul'
+    make_students(class_name, 3)
+
+    response = client.get("/api/students/cards.pdf", params={"class_name": class_name}, headers=admin_headers)
+
+    assert response.status_code == 200
+    assert response.content.startswith(b"%PDF-")
+    disposition = response.headers["content-disposition"]
+    assert disposition.startswith('inline; filename="')
+    assert disposition.endswith("filename*=utf-8''" + quote(f"Kartu_{class_name}.pdf", safe=""))
+    assert response.headers["x-skipped-count"] == "0"
@@ -0,0 +1,27 @@
+import pytest
+
+from app.pagination import MAX_PAGE_SIZE
+
+
+@pytest.mark.parametrize("limit", [-1, 0, MAX_PAGE_SIZE + 1])
+def test_students_reject_out_of_range_limit(client, admin_headers, limit):
+    response = client.get("/api/students", params={"limit": limit}, headers=admin_headers)
+    assert response.status_code == 422
+
+
+def test_students_keyset_walk_returns_every_student_once(client, admin_headers, make_students):
+    created = {student_id for student_id, _ in make_students("List-A", 5)}
+    params = {"class_name": "List-A", "sort": "-name", "limit": 2, "fields": "name", "include_total": "true"}
+
+    seen, cursor = [], None
+    while True:
+        response = client.get("/api/students", headers=admin_headers,
+                              params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        assert response.headers["x-total-count"] == "5"
+        seen += [row["id"] for row in response.json()]
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            break
+
+    assert sorted(seen) == sorted(created)
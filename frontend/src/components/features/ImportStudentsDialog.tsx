@@ -58,13 +58,13 @@ export function ImportStudentsDialog({ open, onOpenChange, onSuccess }: ImportSt
 
     const handleFileSelect = (file: File) => {
         // Validate file type
-        const validTypes = ['.csv', 'text/csv', 'application/vnd.ms-excel'];
+        const validExtensions = ['csv', 'xlsx'];
         const fileExt = file.name.split('.').pop()?.toLowerCase();
 
-        if (fileExt !== 'csv') {
+        if (!fileExt || !validExtensions.includes(fileExt)) {
             toast({
                 title: 'File tidak valid',
-                description: 'Hanya file CSV yang didukung',
+                description: 'Hanya file CSV atau XLSX yang didukung',
                 variant: 'destructive',
             });
             return;
@@ -144,7 +144,7 @@ export function ImportStudentsDialog({ open, onOpenChange, onSuccess }: ImportSt
                 <DialogHeader>
                     <DialogTitle>Import Data Siswa</DialogTitle>
                     <DialogDescription>
-                        Upload file CSV untuk menambahkan banyak siswa sekaligus
+                        Upload file CSV atau XLSX untuk menambahkan banyak siswa sekaligus
                     </DialogDescription>
                 </DialogHeader>
 
@@ -206,7 +206,7 @@ export function ImportStudentsDialog({ open, onOpenChange, onSuccess }: ImportSt
                                         <div className="space-y-4">
                                             <Upload className="h-12 w-12 text-muted-foreground mx-auto" />
                                             <div>
-                                                <p className="font-semibold">Drop file CSV di sini</p>
+                                                <p className="font-semibold">Drop file CSV atau XLSX di sini</p>
                                                 <p className="text-sm text-muted-foreground">
                                                     atau klik tombol di bawah untuk memilih file
                                                 </p>
@@ -215,13 +215,13 @@ export function ImportStudentsDialog({ open, onOpenChange, onSuccess }: ImportSt
                                                 <input
                                                     type="file"
                                                     id="file-upload"
-                                                    accept=".csv"
+                                                    accept=".csv,.xlsx"
                                                     onChange={handleFileInput}
                                                     className="hidden"
                                                 />
                                                 <label htmlFor="file-upload">
                                                     <Button asChild variant="default">
-                                                        <span>Pilih File CSV</span>
+                                                        <span>Pilih File</span>
                                                     </Button>
                                                 </label>
                                             </div>
@@ -5,7 +5,6 @@ import { SemesterFilter } from '@/components/features/SemesterFilter';
 import { attendanceService } from '@/services/attendance';
 import type { SemesterReport } from '@/types';
 import { studentsService } from '@/services/students';
-import { exportSemesterReport } from '@/utils/exportExcel';
 import { formatPercentage, getPercentageColor, getSemesterLabel, getAcademicYear } from '@/utils/formatters';
 import { Button } from '@/components/ui/button';
 import { Card, CardContent, CardHeader, CardTitle } from '@/components/ui/card';
@@ -171,7 +170,7 @@ export default function ReportsPage() {
     }
   };
 
-  const handleExport = () => {
+  const handleExport = async () => {
     if (reports.length === 0) {
       toast({
         title: 'Tidak ada data',
@@ -183,11 +182,14 @@ export default function ReportsPage() {
 
     setIsExporting(true);
     try {
-      exportSemesterReport(reports, {
+      // Generated server-side so large reports don't have to be built in the browser
+      await attendanceService.exportSemesterReport(
         semester,
         year,
-        classFilter: classFilter === 'all' ? undefined : classFilter,
-      });
+        classFilter === 'all' ? undefined : classFilter,
+        'xlsx',
+        classFilter === 'all'
+      );
       toast({
         title: 'Berhasil! 📤',
         description: 'Laporan berhasil diunduh',
@@ -1,8 +1,8 @@
 // API Configuration
 const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || 'http://localhost:8000/api';
 
-// Generic fetch wrapper with authentication
-export async function apiFetch<T>(endpoint: string, options: RequestInit = {}): Promise<T> {
+// Fetch with authentication; throws on error responses
+async function apiResponse(endpoint: string, options: RequestInit = {}): Promise<Response> {
   const token = localStorage.getItem('auth_token');
 
   const headers: HeadersInit = {
@@ -29,6 +29,13 @@ export async function apiFetch<T>(endpoint: string, options: RequestInit = {}):
     throw new Error(`API Error: ${response.status}`);
   }
 
+  return response;
+}
+
+// Generic fetch wrapper with authentication
+export async function apiFetch<T>(endpoint: string, options: RequestInit = {}): Promise<T> {
+  const response = await apiResponse(endpoint, options);
+
   // Handle 204 No Content - don't try to parse JSON
   if (response.status === 204) {
     return undefined as T;
@@ -37,6 +44,24 @@ export async function apiFetch<T>(endpoint: string, options: RequestInit = {}):
   return response.json();
 }
 
+// One page of a keyset-paginated list, with its paging headers
+export interface Page<T> {
+  items: T[];
+  nextCursor: string | null; // X-Next-Cursor; null on the last page
+  total: number | null; // X-Total-Count, when requested with include_total
+}
+
+export async function apiFetchPage<T>(endpoint: string, options: RequestInit = {}): Promise<Page<T>> {
+  const response = await apiResponse(endpoint, options);
+  const total = response.headers.get('X-Total-Count');
+
+  return {
+    items: await response.json(),
+    nextCursor: response.headers.get('X-Next-Cursor'),
+    total: total === null ? null : Number(total),
+  };
+}
+
 // Auth API
 export const authAPI = {
   login: async (username: string, password: string): Promise<{ access_token: string; role: string }> => {
@@ -1,4 +1,5 @@
-import { apiFetch } from './api';
+import { apiFetch, apiFetchPage, API_BASE_URL } from './api';
+import type { Page } from './api';
 import type { AttendanceRecord, ScanResult, AttendanceStats, SemesterReport } from '../types';
 
 export interface StudentAttendanceStatus {
@@ -24,6 +25,34 @@ export interface BatchUpdateResponse {
   total: number;
 }
 
+interface HistoryFilters {
+  date?: string;
+  from?: string;
+  to?: string;
+  class_name?: string;
+  student_id?: number;
+  cursor?: string;
+  include_total?: boolean;
+  skip?: number;
+  limit?: number;
+}
+
+function historyEndpoint(filters?: HistoryFilters): string {
+  const params = new URLSearchParams();
+  if (filters?.date) params.append('date', filters.date);
+  if (filters?.from) params.append('from', filters.from);
+  if (filters?.to) params.append('to', filters.to);
+  if (filters?.class_name) params.append('class_name', filters.class_name);
+  if (filters?.student_id) params.append('student_id', filters.student_id.toString());
+  if (filters?.cursor) params.append('cursor', filters.cursor);
+  if (filters?.include_total) params.append('include_total', 'true');
+  if (filters?.skip) params.append('skip', filters.skip.toString());
+  if (filters?.limit) params.append('limit', filters.limit.toString());
+
+  const queryString = params.toString();
+  return queryString ? `/attendance/history?${queryString}` : '/attendance/history';
+}
+
 export const attendanceService = {
   // Record attendance from QR/barcode scan
   scan: async (token: string): Promise<ScanResult> => {
@@ -34,22 +63,13 @@ export const attendanceService = {
   },
 
   // Get attendance history with optional filters
-  getHistory: async (filters?: {
-    date?: string;
-    student_id?: number;
-    skip?: number;
-    limit?: number;
-  }): Promise<AttendanceRecord[]> => {
-    const params = new URLSearchParams();
-    if (filters?.date) params.append('date', filters.date);
-    if (filters?.student_id) params.append('student_id', filters.student_id.toString());
-    if (filters?.skip) params.append('skip', filters.skip.toString());
-    if (filters?.limit) params.append('limit', filters.limit.toString());
-
-    const queryString = params.toString();
-    const endpoint = queryString ? `/attendance/history?${queryString}` : '/attendance/history';
+  getHistory: async (filters?: Omit<HistoryFilters, 'cursor' | 'include_total'>): Promise<AttendanceRecord[]> => {
+    return apiFetch<AttendanceRecord[]>(historyEndpoint(filters));
+  },
 
-    return apiFetch<AttendanceRecord[]>(endpoint);
+  // Get one page of attendance history; pass nextCursor back as cursor for the next page
+  getHistoryPage: async (filters?: Omit<HistoryFilters, 'skip'>): Promise<Page<AttendanceRecord>> => {
+    return apiFetchPage<AttendanceRecord>(historyEndpoint(filters));
   },
 
   // Get today's attendance
@@ -110,6 +130,48 @@ export const attendanceService = {
     }));
   },
 
+  // Download the semester report as a file generated by the server
+  exportSemesterReport: async (
+    semester: 1 | 2,
+    year: number,
+    class_name?: string,
+    format: 'xlsx' | 'csv' = 'xlsx',
+    perClass = false
+  ): Promise<void> => {
+    const params = new URLSearchParams();
+    params.append('semester', semester.toString());
+    params.append('year', year.toString());
+    params.append('format', format);
+    if (class_name) params.append('class_name', class_name);
+    if (perClass) params.append('per_class', 'true');
+
+    const token = localStorage.getItem('auth_token');
+    const response = await fetch(`${API_BASE_URL}/reports/semester/export?${params}`, {
+      headers: {
+        'Authorization': `Bearer ${token}`,
+      },
+    });
+
+    if (!response.ok) {
+      throw new Error(`API Error: ${response.status}`);
+    }
+
+    const disposition = response.headers.get('Content-Disposition') || '';
+    const match = disposition.match(/filename="?([^"]+)"?/);
+    const filename = match ? match[1] : `Laporan_Absensi.${format}`;
+
+    const blob = await response.blob();
+    const url = URL.createObjectURL(blob);
+    const link = document.createElement('a');
+    link.href = url;
+    link.download = filename;
+    link.style.display = 'none';
+    document.body.appendChild(link);
+    link.click();
+    document.body.removeChild(link);
+    URL.revokeObjectURL(url);
+  },
+
   // Get class attendance for a specific date
   getClassAttendance: async (
     date: string,
@@ -1,10 +1,43 @@
-import { apiFetch, API_BASE_URL } from './api';
+import { apiFetch, apiFetchPage, API_BASE_URL } from './api';
+import type { Page } from './api';
 import type { Student, StudentCreate, StudentUpdate } from '../types';
 
+interface StudentFilters<F extends keyof Student = keyof Student> {
+  class_name?: string;
+  q?: string;
+  sort?: 'id' | 'name' | 'nis' | 'class_name' | '-id' | '-name' | '-nis' | '-class_name';
+  fields?: F[];
+  cursor?: string;
+  include_total?: boolean;
+  limit?: number;
+}
+
+function studentsEndpoint(filters?: StudentFilters): string {
+  const params = new URLSearchParams();
+  if (filters?.class_name) params.append('class_name', filters.class_name);
+  if (filters?.q) params.append('q', filters.q);
+  if (filters?.sort) params.append('sort', filters.sort);
+  if (filters?.fields) params.append('fields', filters.fields.join(','));
+  if (filters?.cursor) params.append('cursor', filters.cursor);
+  if (filters?.include_total) params.append('include_total', 'true');
+  if (filters?.limit) params.append('limit', filters.limit.toString());
+
+  const queryString = params.toString();
+  return queryString ? `/students?${queryString}` : '/students';
+}
+
 export const studentsService = {
-  // Get all students
-  getAll: async (): Promise<Student[]> => {
-    return apiFetch<Student[]>('/students');
+  // Get students (a teacher only gets their classes)
+  getAll: async (filters?: Omit<StudentFilters, 'fields' | 'cursor' | 'include_total'>): Promise<Student[]> => {
+    return apiFetch<Student[]>(studentsEndpoint(filters));
+  },
+
+  // Get one page of students; pass nextCursor back as cursor for the next page.
+  // With fields, items only hold those fields (and id).
+  getPage: async <F extends keyof Student = keyof Student>(
+    filters?: StudentFilters<F>
+  ): Promise<Page<Pick<Student, F | 'id'>>> => {
+    return apiFetchPage<Pick<Student, F | 'id'>>(studentsEndpoint(filters));
   },
 
   // Get student by ID
@@ -91,8 +124,19 @@ export const studentsService = {
     return response.classes;
   },
 
-  // Import students from CSV file
-  importStudents: async (file: File): Promise<{
+  // Import students from a CSV or XLSX file. mode 'upsert' syncs the whole
+  // roster (inserts, updates and, with removeMissing, removals); dryRun only
+  // reports the changes. A real run with removeMissing must pass the dry
+  // run's `removed` count as expectedRemovals.
+  importStudents: async (
+    file: File,
+    options: {
+      mode?: 'insert' | 'upsert';
+      dryRun?: boolean;
+      removeMissing?: boolean;
+      expectedRemovals?: number;
+    } = {}
+  ): Promise<{
     total_rows: number;
     success: number;
     failed: number;
@@ -105,12 +149,33 @@ export const studentsService = {
       success: boolean;
       error?: string;
     }>;
+    dry_run?: boolean;
+    inserted?: number;
+    updated?: number;
+    unchanged?: number;
+    removed?: number;
+    changes?: Array<{
+      action: 'insert' | 'update' | 'remove';
+      student_id?: number;
+      nis: string;
+      name: string;
+      class_name: string;
+      old_name?: string;
+      old_class_name?: string;
+    }>;
   }> => {
     const formData = new FormData();
     formData.append('file', file);
 
+    const params = new URLSearchParams({ mode: options.mode ?? 'insert' });
+    if (options.dryRun) params.append('dry_run', 'true');
+    if (options.removeMissing) params.append('remove_missing', 'true');
+    if (options.expectedRemovals !== undefined) {
+      params.append('expected_removals', options.expectedRemovals.toString());
+    }
+
     const token = localStorage.getItem('auth_token');
-    const response = await fetch(`${API_BASE_URL}/students/import`, {
+    const response = await fetch(`${API_BASE_URL}/students/import?${params}`, {
       method: 'POST',
       headers: {
         'Authorization': `Bearer ${token}`,